@@ -0,0 +1,29 @@
+import { type NextRequest, NextResponse } from "next/server"
+
+export async function POST(request: NextRequest) {
+  const token = request.cookies.get("auth_token")?.value
+
+  if (!token) {
+    return NextResponse.json({ error: "Unauthorized" }, { status: 401 })
+  }
+
+  try {
+    const body = await request.json()
+
+    // Proxy to backend FastAPI: the order is built from the server-side cart
+    const response = await fetch("http://backend:8001/api/cart/checkout", {
+      method: "POST",
+      headers: {
+        Cookie: `auth_token=${token}`,
+        "Content-Type": "application/json",
+      },
+      body: JSON.stringify(body),
+    })
+
+    const data = await response.json()
+    return NextResponse.json(data, { status: response.status })
+  } catch (error) {
+    console.error("Checkout API error:", error)
+    return NextResponse.json({ error: "Failed to place order" }, { status: 500 })
+  }
+}
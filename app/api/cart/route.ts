@@ -107,3 +107,31 @@ export async function PUT(request: NextRequest) {
     return NextResponse.json({ error: "Failed to clear cart" }, { status: 500 })
   }
 }
+
+export async function PATCH(request: NextRequest) {
+  const token = request.cookies.get("auth_token")?.value
+
+  if (!token) {
+    return NextResponse.json({ error: "Unauthorized" }, { status: 401 })
+  }
+
+  try {
+    const body = await request.json()
+
+    // Proxy to backend FastAPI: a list of { menuId, quantityDelta } applied in one batch
+    const response = await fetch("http://backend:8001/api/cart", {
+      method: "PATCH",
+      headers: {
+        Cookie: `auth_token=${token}`,
+        "Content-Type": "application/json",
+      },
+      body: JSON.stringify(body),
+    })
+
+    const data = await response.json()
+    return NextResponse.json(data, { status: response.status })
+  } catch (error) {
+    console.error("Update cart API error:", error)
+    return NextResponse.json({ error: "Failed to update cart" }, { status: 500 })
+  }
+}
@@ -0,0 +1,37 @@
+import { type NextRequest, NextResponse } from "next/server"
+
+export async function GET(request: NextRequest) {
+  const token = request.cookies.get("auth_token")?.value
+
+  if (!token) {
+    return NextResponse.json({ error: "Unauthorized" }, { status: 401 })
+  }
+
+  try {
+    // Proxy the backend's Server-Sent Events stream as it arrives; aborted when the browser disconnects
+    const response = await fetch("http://backend:8001/api/orders/events", {
+      method: "GET",
+      headers: {
+        Cookie: `auth_token=${token}`,
+      },
+      cache: "no-store",
+      signal: request.signal,
+    })
+
+    if (!response.ok || !response.body) {
+      const data = await response.json()
+      return NextResponse.json(data, { status: response.status })
+    }
+
+    return new Response(response.body, {
+      headers: {
+        "Content-Type": "text/event-stream",
+        "Cache-Control": "no-cache, no-transform",
+        "X-Accel-Buffering": "no",
+      },
+    })
+  } catch (error) {
+    console.error("Order events API error:", error)
+    return NextResponse.json({ error: "Failed to open order events" }, { status: 500 })
+  }
+}
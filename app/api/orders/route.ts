@@ -8,8 +8,8 @@ export async function GET(request: NextRequest) {
   }
 
   try {
-    // Proxy to backend FastAPI with proper cookie header
-    const response = await fetch("http://backend:8001/api/orders", {
+    // Proxy to backend FastAPI with proper cookie header (limit/cursor are passed through)
+    const response = await fetch(`http://backend:8001/api/orders${request.nextUrl.search}`, {
       method: "GET",
       headers: {
         Cookie: `auth_token=${token}`,
@@ -17,7 +17,11 @@ export async function GET(request: NextRequest) {
     })
 
     const data = await response.json()
-    return NextResponse.json(data, { status: response.status })
+    const nextCursor = response.headers.get("X-Next-Cursor")
+    return NextResponse.json(data, {
+      status: response.status,
+      headers: nextCursor ? { "X-Next-Cursor": nextCursor } : undefined,
+    })
   } catch (error) {
     console.error("Orders API error:", error)
     return NextResponse.json({ error: "Failed to fetch orders" }, { status: 500 })
@@ -7,17 +7,31 @@ export async function GET(request: NextRequest) {
     return NextResponse.json({ error: "Unauthorized" }, { status: 401 })
   }
 
+  const ifNoneMatch = request.headers.get("if-none-match")
+
   try {
     // Proxy to backend FastAPI
     const response = await fetch("http://backend:8001/api/restaurants", {
       method: "GET",
       headers: {
         Cookie: `auth_token=${token}`,
+        ...(ifNoneMatch ? { "If-None-Match": ifNoneMatch } : {}),
       },
     })
 
+    // Pass validators through so the browser can revalidate instead of re-downloading
+    const cacheHeaders: Record<string, string> = {}
+    for (const name of ["ETag", "Cache-Control", "Vary"]) {
+      const value = response.headers.get(name)
+      if (value) cacheHeaders[name] = value
+    }
+
+    if (response.status === 304) {
+      return new NextResponse(null, { status: 304, headers: cacheHeaders })
+    }
+
     const data = await response.json()
-    return NextResponse.json(data, { status: response.status })
+    return NextResponse.json(data, { status: response.status, headers: cacheHeaders })
   } catch (error) {
     console.error("Restaurants API error:", error)
     return NextResponse.json({ error: "Failed to fetch restaurants" }, { status: 500 })
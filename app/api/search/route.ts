@@ -0,0 +1,29 @@
+import { type NextRequest, NextResponse } from "next/server"
+
+export async function GET(request: NextRequest) {
+  const token = request.cookies.get("auth_token")?.value
+
+  if (!token) {
+    return NextResponse.json({ error: "Unauthorized" }, { status: 401 })
+  }
+
+  try {
+    // Proxy to backend FastAPI (q/limit/offset are passed through)
+    const response = await fetch(`http://backend:8001/api/search${request.nextUrl.search}`, {
+      method: "GET",
+      headers: {
+        Cookie: `auth_token=${token}`,
+      },
+    })
+
+    const data = await response.json()
+    const nextOffset = response.headers.get("X-Next-Offset")
+    return NextResponse.json(data, {
+      status: response.status,
+      headers: nextOffset ? { "X-Next-Offset": nextOffset } : undefined,
+    })
+  } catch (error) {
+    console.error("Search API error:", error)
+    return NextResponse.json({ error: "Failed to search" }, { status: 500 })
+  }
+}
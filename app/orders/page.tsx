@@ -10,13 +10,19 @@ interface Order {
   totalAmount: number
   items: { itemId: string; name: string; qty: number }[]
   status: string
+  version: number
   createdAt: string
 }
 
+// Changes pushed by GET /api/orders/events; order.created also carries the items
+type OrderChange = Omit<Order, "items"> & { items?: Order["items"] }
+
 export default function OrdersPage() {
   const [orders, setOrders] = useState<Order[]>([])
   const [user, setUser] = useState<{ role: string } | null>(null)
   const [loading, setLoading] = useState(true)
+  // X-Next-Cursor of the last page loaded; null once every order is listed
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
 
   useEffect(() => {
     const userStr = localStorage.getItem("user")
@@ -24,8 +30,40 @@ export default function OrdersPage() {
       setUser(JSON.parse(userStr))
     }
     fetchOrders()
+
+    // Live updates instead of polling; after a reconnect or a resync, events may have been missed
+    const events = new EventSource("/api/orders/events")
+    let opened = false
+    events.onopen = () => {
+      if (opened) fetchOrders()
+      opened = true
+    }
+    events.addEventListener("order.created", (event) => {
+      const order: OrderChange = JSON.parse((event as MessageEvent).data)
+      if (!order.items) {
+        fetchOrders()
+        return
+      }
+      setOrders((current) =>
+        current.some((o) => o.id === order.id) ? current : [order as Order, ...current]
+      )
+    })
+    const onStatusChange = (event: Event) => applyChange(JSON.parse((event as MessageEvent).data))
+    events.addEventListener("order.cancelled", onStatusChange)
+    events.addEventListener("order.updated", onStatusChange)
+    events.addEventListener("resync", () => fetchOrders())
+    return () => events.close()
   }, [])
 
+  // Older versions are ignored: events and responses can arrive in either order
+  const applyChange = (change: OrderChange) => {
+    setOrders((current) =>
+      current.map((o) =>
+        o.id === change.id && change.version > o.version ? { ...o, status: change.status, version: change.version } : o
+      )
+    )
+  }
+
   const fetchOrders = async () => {
     try {
       const response = await fetch("/api/orders")
@@ -46,6 +84,7 @@ export default function OrdersPage() {
       if (Array.isArray(data)) {
         console.log("First order ID:", data[0]?.id)
         setOrders(data)
+        setNextCursor(response.headers.get("X-Next-Cursor"))
       } else {
         setOrders([])
       }
@@ -57,6 +96,20 @@ export default function OrdersPage() {
     }
   }
 
+  const loadMoreOrders = async () => {
+    if (!nextCursor) return
+    try {
+      const response = await fetch(`/api/orders?cursor=${encodeURIComponent(nextCursor)}`)
+      if (!response.ok) return
+      const data: Order[] = await response.json()
+      // Orders pushed by events while paging may already be listed
+      setOrders((current) => [...current, ...data.filter((order) => !current.some((o) => o.id === order.id))])
+      setNextCursor(response.headers.get("X-Next-Cursor"))
+    } catch (error) {
+      console.error("Failed to load more orders:", error)
+    }
+  }
+
   const handleCancelOrder = async (orderId: string) => {
     if (!confirm("Are you sure you want to cancel this order?")) return
 
@@ -66,8 +119,8 @@ export default function OrdersPage() {
       })
 
       if (response.ok) {
+        applyChange(await response.json())
         alert("Order cancelled successfully")
-        fetchOrders()
       }
     } catch (error) {
       console.error("Failed to cancel order:", error)
@@ -158,6 +211,14 @@ export default function OrdersPage() {
                 )}
               </div>
             ))}
+            {nextCursor && (
+              <button
+                onClick={loadMoreOrders}
+                className="w-full bg-secondary hover:bg-secondary/80 text-secondary-foreground font-bold py-2 px-4 rounded-lg transition-all"
+              >
+                Load More Orders
+              </button>
+            )}
           </div>
         )}
       </div>
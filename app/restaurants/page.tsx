@@ -261,28 +261,15 @@ export default function RestaurantsPage() {
     const restaurantId = cart[0].restaurantId
 
     try {
-      // Transform cart items to match backend expected format
-      const orderItems = cart.map(item => ({
-        menuId: item.menuId,
-        quantity: item.quantity,
-        price: item.price
-      }))
-
-      const response = await fetch("/api/orders", {
+      // The backend builds the order from the stored cart and empties it
+      const response = await fetch("/api/cart/checkout", {
         method: "POST",
         headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({
-          restaurantId,
-          items: orderItems,
-          totalAmount: getTotalPrice(),
-          paymentMethodId: selectedPaymentMethod,
-        }),
+        body: JSON.stringify({ restaurantId }),
       })
 
       if (response.ok) {
         alert("Order placed and paid successfully!")
-        // Clear cart on backend
-        await fetch("/api/cart", { method: "PUT" })
         await fetchCart() // Refresh cart
         setSelectedRestaurant(null)
         setShowCheckoutModal(false)
@@ -1,5 +1,8 @@
 from django.contrib import admin
+from django.db.models import F
+
 from .models import User, Restaurant, Menu, Order, OrderItem, PaymentMethod
+from .order_summaries import refresh
 
 
 @admin.register(User)
@@ -33,8 +36,23 @@ class OrderAdmin(admin.ModelAdmin):
     list_display = ("id", "user", "restaurant", "total_amount", "status", "created_at")
     list_filter = ("status", "restaurant__country")
     search_fields = ("user__email", "restaurant__name")
+    readonly_fields = ("version",)
     inlines = [OrderItemInline]
 
+    def save_model(self, request, obj, form, change):
+        # A status edit is a transition like any other: clients holding the old version get a 409
+        transition = change and "status" in form.changed_data
+        if transition:
+            obj.version = F("version") + 1
+        super().save_model(request, obj, form, change)
+        if transition:
+            obj.refresh_from_db(fields=["version"])
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # The API writes the OrderSummary alongside the order; do the same once the items are saved
+        refresh([form.instance.pk])
+
 
 @admin.register(PaymentMethod)
 class PaymentMethodAdmin(admin.ModelAdmin):
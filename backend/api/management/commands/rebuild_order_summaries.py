@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from api.order_summaries import rebuild
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the OrderSummary read model from the Order tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        total = rebuild(batch_size=options["batch_size"], log=self.stdout.write)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {total} order summaries"))
@@ -1,20 +1,46 @@
+import time
+
 from django.core.management.base import BaseCommand
+from django.db import connection
 from api.models import User, Restaurant, Menu, PaymentMethod
+from api.signals import bump_catalog_version
+from api.synthetic_data import generate
 
 
 class Command(BaseCommand):
-    help = "Seeds the database with initial data"
+    help = "Seeds the database with initial data, plus optional synthetic data for load testing"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--restaurants", type=int, default=0, help="Synthetic restaurants to add")
+        parser.add_argument("--menus-per-restaurant", type=int, default=8)
+        parser.add_argument("--users", type=int, default=0, help="Synthetic users to add (password: loadtest123)")
+        parser.add_argument("--orders", type=int, default=0, help="Synthetic orders to add, with items and summaries")
+        parser.add_argument("--countries", type=int, default=3, help="Countries to spread synthetic rows over")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed; the same seed gives the same rows")
+        parser.add_argument("--batch-size", type=int, default=10000)
+        parser.add_argument("--workers", type=int, default=1, help="Processes generating orders in parallel")
+        parser.add_argument(
+            "--if-empty", action="store_true", help="Do nothing if there are users already (safe on every deploy)"
+        )
+
+    def handle(self, *args, **options):
+        if options["if_empty"] and User.objects.exists():
+            self.stdout.write("Database already has users, skipping seed")
+            return
 
-    def handle(self, *args, **kwargs):
         # Clear existing data
-        User.objects.all().delete()
-        Restaurant.objects.all().delete()
-        Menu.objects.all().delete()
-        PaymentMethod.objects.all().delete()
+        if connection.vendor == "postgresql":
+            # Cascading deletes through the ORM load every row; TRUNCATE does not
+            with connection.cursor() as cursor:
+                cursor.execute("TRUNCATE api_user, api_restaurant CASCADE")
+        else:
+            User.objects.all().delete()
+            Restaurant.objects.all().delete()
+            Menu.objects.all().delete()
+            PaymentMethod.objects.all().delete()
 
         self.stdout.write("Creating users...")
-        # Note: Using plain passwords for FastAPI compatibility (dev only!)
-        admin = User.objects.create(
+        admin = User.objects.create_user(
             email="nickfury@admin.com",
             password="admin123",
             name="Nick Fury",
@@ -23,7 +49,7 @@ class Command(BaseCommand):
             is_staff=True,
         )
 
-        manager_india = User.objects.create(
+        manager_india = User.objects.create_user(
             email="captainmarvel@manager.com",
             password="manager123",
             name="Captain Marvel",
@@ -31,7 +57,7 @@ class Command(BaseCommand):
             country="India",
         )
 
-        manager_usa = User.objects.create(
+        manager_usa = User.objects.create_user(
             email="captainamerica@manager.com",
             password="manager123",
             name="Captain America",
@@ -39,7 +65,7 @@ class Command(BaseCommand):
             country="USA",
         )
 
-        member_india_1 = User.objects.create(
+        member_india_1 = User.objects.create_user(
             email="thanos@member.com",
             password="member123",
             name="Thanos",
@@ -47,7 +73,7 @@ class Command(BaseCommand):
             country="India",
         )
 
-        member_india_2 = User.objects.create(
+        member_india_2 = User.objects.create_user(
             email="thor@member.com",
             password="member123",
             name="Thor",
@@ -55,7 +81,7 @@ class Command(BaseCommand):
             country="India",
         )
 
-        member_usa = User.objects.create(
+        member_usa = User.objects.create_user(
             email="travis@member.com",
             password="member123",
             name="Travis",
@@ -459,4 +485,24 @@ class Command(BaseCommand):
             type="debit_card",
         )
 
+        if options["restaurants"] or options["users"] or options["orders"]:
+            started = time.monotonic()
+            generate(
+                restaurants=options["restaurants"],
+                menus_per_restaurant=options["menus_per_restaurant"],
+                users=options["users"],
+                orders=options["orders"],
+                countries=options["countries"],
+                seed=options["seed"],
+                batch_size=options["batch_size"],
+                workers=options["workers"],
+                log=self.stdout.write,
+            )
+            # Bulk writes bypass the model signals that track catalog changes
+            bump_catalog_version()
+            if connection.vendor == "postgresql":
+                with connection.cursor() as cursor:
+                    cursor.execute("ANALYZE")
+            self.stdout.write(f"Synthetic data created in {time.monotonic() - started:.1f}s")
+
         self.stdout.write(self.style.SUCCESS("Database seeded successfully!"))
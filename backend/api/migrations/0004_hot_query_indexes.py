@@ -0,0 +1,51 @@
+# Migration adding indexes for the country- and user-scoped API queries
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def merge_duplicate_cart_items(apps, schema_editor):
+    # add_to_cart treated (user, menu) as unique without enforcing it; fold any
+    # duplicates into the oldest row before the constraint is created.
+    CartItem = apps.get_model('api', 'CartItem')
+    duplicates = (
+        CartItem.objects.values('user_id', 'menu_id')
+        .annotate(rows=Count('id'), total=Sum('quantity'))
+        .filter(rows__gt=1)
+    )
+    for dup in duplicates:
+        items = CartItem.objects.filter(user_id=dup['user_id'], menu_id=dup['menu_id']).order_by('created_at', 'id')
+        keep = items.first()
+        items.exclude(id=keep.id).delete()
+        CartItem.objects.filter(id=keep.id).update(quantity=dup['total'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_authsession'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_cart_items, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='restaurant',
+            index=models.Index(fields=['country'], name='api_restaurant_country_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['-created_at', '-id'], name='api_order_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['restaurant', '-created_at', '-id'], name='api_order_rest_created_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='cartitem',
+            constraint=models.UniqueConstraint(fields=('user', 'menu'), name='api_cartitem_user_menu_uniq'),
+        ),
+        migrations.AddIndex(
+            model_name='cartitem',
+            index=models.Index(fields=['user', '-created_at'], name='api_cartitem_user_created_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Migration to add the OrderSummary read model
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_catalogversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderSummary',
+            fields=[
+                ('order', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='api.order')),
+                ('user_id', models.UUIDField()),
+                ('user_email', models.EmailField(max_length=254)),
+                ('user_name', models.CharField(max_length=255)),
+                ('restaurant_id', models.UUIDField()),
+                ('restaurant_name', models.CharField(max_length=255)),
+                ('restaurant_country', models.CharField(max_length=100)),
+                ('total_amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('confirmed', 'Confirmed'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('created_at', models.DateTimeField()),
+                ('items', models.JSONField(default=list)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-created_at', '-order'], name='api_ordersum_created_idx'), models.Index(fields=['restaurant_country', '-created_at', '-order'], name='api_ordersum_country_idx')],
+            },
+        ),
+    ]
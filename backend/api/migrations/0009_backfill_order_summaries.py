@@ -0,0 +1,54 @@
+# Migration filling in the OrderSummary of orders created before the read model existed
+
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def backfill_order_summaries(apps, schema_editor):
+    # Historical models, so this keeps working as api/order_summaries.py changes;
+    # the rows are built the same way as summarize() builds them
+    Order = apps.get_model('api', 'Order')
+    OrderSummary = apps.get_model('api', 'OrderSummary')
+    orders = (
+        Order.objects.filter(summary__isnull=True)
+        .select_related('user', 'restaurant')
+        .prefetch_related('items__menu')
+        .order_by('pk')
+    )
+    while True:
+        # Orders summarized by the previous batch drop out of the filter
+        batch = list(orders[:BATCH_SIZE])
+        if not batch:
+            return
+        OrderSummary.objects.bulk_create([
+            OrderSummary(
+                order=order,
+                user_id=order.user_id,
+                user_email=order.user.email,
+                user_name=order.user.name,
+                restaurant_id=order.restaurant_id,
+                restaurant_name=order.restaurant.name,
+                restaurant_country=order.restaurant.country,
+                total_amount=order.total_amount,
+                status=order.status,
+                version=order.version,
+                created_at=order.created_at,
+                items=[
+                    {"itemId": str(item.menu_id), "name": item.menu.name, "qty": item.quantity, "price": float(item.price)}
+                    for item in order.items.all()
+                ],
+            )
+            for order in batch
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_order_lifecycle'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_order_summaries, migrations.RunPython.noop),
+    ]
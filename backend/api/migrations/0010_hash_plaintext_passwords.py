@@ -0,0 +1,35 @@
+# Migration hashing passwords stored in plain text before login used check_password
+
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX, identify_hasher, make_password
+from django.db import migrations
+
+BATCH_SIZE = 500
+
+
+def hash_plaintext_passwords(apps, schema_editor):
+    User = apps.get_model('api', 'User')
+    batch = []
+    for user in User.objects.only('id', 'password').order_by('pk').iterator(chunk_size=BATCH_SIZE):
+        # Empty and unusable passwords stay as they are: nobody can log in with them
+        if not user.password or user.password.startswith(UNUSABLE_PASSWORD_PREFIX):
+            continue
+        try:
+            identify_hasher(user.password)
+        except ValueError:
+            user.password = make_password(user.password)
+            batch.append(user)
+        if len(batch) >= BATCH_SIZE:
+            User.objects.bulk_update(batch, ['password'])
+            batch = []
+    User.objects.bulk_update(batch, ['password'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_backfill_order_summaries'),
+    ]
+
+    operations = [
+        migrations.RunPython(hash_plaintext_passwords, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,83 @@
+# Migration storing the weighted search document of each menu item (PostgreSQL only)
+#
+# api_menu.search_vector holds the weighted document /api/search matches and
+# ranks, kept up to date by triggers, under one GIN index. The column is not
+# on the Menu model: only fastapi_app/search.py reads it.
+
+from django.db import migrations
+
+# Same expression as Menu.objects.refresh_search_vectors() in api/models.py
+MENU_VECTOR = """
+    setweight(to_tsvector('english', {menu}.name), 'A')
+    || setweight(to_tsvector('english', {menu}.description), 'B')
+    || setweight(to_tsvector('english', {restaurant}.name), 'C')
+    || setweight(to_tsvector('english', {restaurant}.description), 'D')
+"""
+
+FORWARD = f"""
+ALTER TABLE api_menu ADD COLUMN search_vector tsvector;
+
+CREATE FUNCTION api_menu_search_vector() RETURNS trigger AS $$
+BEGIN
+    SELECT {MENU_VECTOR.format(menu='NEW', restaurant='r')} INTO NEW.search_vector
+    FROM api_restaurant r WHERE r.id = NEW.restaurant_id;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER api_menu_search_vector
+BEFORE INSERT OR UPDATE OF name, description, restaurant_id ON api_menu
+FOR EACH ROW EXECUTE FUNCTION api_menu_search_vector();
+
+CREATE FUNCTION api_restaurant_search_vector() RETURNS trigger AS $$
+BEGIN
+    UPDATE api_menu m SET search_vector = {MENU_VECTOR.format(menu='m', restaurant='NEW')}
+    WHERE m.restaurant_id = NEW.id;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER api_restaurant_search_vector
+AFTER UPDATE OF name, description ON api_restaurant
+FOR EACH ROW WHEN (OLD.name IS DISTINCT FROM NEW.name OR OLD.description IS DISTINCT FROM NEW.description)
+EXECUTE FUNCTION api_restaurant_search_vector();
+
+UPDATE api_menu m SET search_vector = {MENU_VECTOR.format(menu='m', restaurant='r')}
+FROM api_restaurant r WHERE r.id = m.restaurant_id;
+
+CREATE INDEX api_menu_search_vector_idx ON api_menu USING GIN (search_vector);
+-- Expression indexes of the unreleased 0007_search_indexes, folded into this migration
+DROP INDEX IF EXISTS api_menu_search_idx;
+DROP INDEX IF EXISTS api_restaurant_search_idx;
+"""
+
+BACKWARD = """
+DROP TRIGGER api_restaurant_search_vector ON api_restaurant;
+DROP FUNCTION api_restaurant_search_vector();
+DROP TRIGGER api_menu_search_vector ON api_menu;
+DROP FUNCTION api_menu_search_vector();
+ALTER TABLE api_menu DROP COLUMN search_vector;
+"""
+
+
+def add_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(FORWARD)
+
+
+def remove_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(BACKWARD)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_hash_plaintext_passwords'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_search_vector, remove_search_vector),
+    ]
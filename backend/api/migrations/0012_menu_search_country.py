@@ -0,0 +1,114 @@
+# Migration copying each menu item's restaurant country next to its search vector (PostgreSQL only)
+#
+# /api/search scoped to a country then reads only that country's matches:
+# through the (search_country, id) index in id order, or with the GIN index
+# combined with it. It also gives the planner finer statistics on
+# search_vector, whose match estimates fastapi_app/search.py relies on.
+
+from django.db import migrations
+
+FORWARD = """
+ALTER TABLE api_menu ADD COLUMN search_country varchar(100);
+
+CREATE OR REPLACE FUNCTION api_menu_search_vector() RETURNS trigger AS $$
+BEGIN
+    SELECT
+        setweight(to_tsvector('english', NEW.name), 'A')
+        || setweight(to_tsvector('english', NEW.description), 'B')
+        || setweight(to_tsvector('english', r.name), 'C')
+        || setweight(to_tsvector('english', r.description), 'D'),
+        r.country
+    INTO NEW.search_vector, NEW.search_country
+    FROM api_restaurant r WHERE r.id = NEW.restaurant_id;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION api_restaurant_search_vector() RETURNS trigger AS $$
+BEGIN
+    UPDATE api_menu m SET
+        search_vector = setweight(to_tsvector('english', m.name), 'A')
+            || setweight(to_tsvector('english', m.description), 'B')
+            || setweight(to_tsvector('english', NEW.name), 'C')
+            || setweight(to_tsvector('english', NEW.description), 'D'),
+        search_country = NEW.country
+    WHERE m.restaurant_id = NEW.id;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER api_restaurant_search_vector ON api_restaurant;
+CREATE TRIGGER api_restaurant_search_vector
+AFTER UPDATE OF name, description, country ON api_restaurant
+FOR EACH ROW WHEN (
+    OLD.name IS DISTINCT FROM NEW.name
+    OR OLD.description IS DISTINCT FROM NEW.description
+    OR OLD.country IS DISTINCT FROM NEW.country
+)
+EXECUTE FUNCTION api_restaurant_search_vector();
+
+UPDATE api_menu m SET search_country = r.country FROM api_restaurant r WHERE r.id = m.restaurant_id;
+
+CREATE INDEX api_menu_search_country_idx ON api_menu (search_country, id);
+ALTER TABLE api_menu ALTER COLUMN search_vector SET STATISTICS 1000;
+ANALYZE api_menu;
+"""
+
+BACKWARD = """
+ALTER TABLE api_menu ALTER COLUMN search_vector SET STATISTICS -1;
+DROP INDEX api_menu_search_country_idx;
+
+CREATE OR REPLACE FUNCTION api_restaurant_search_vector() RETURNS trigger AS $$
+BEGIN
+    UPDATE api_menu m SET search_vector = setweight(to_tsvector('english', m.name), 'A')
+        || setweight(to_tsvector('english', m.description), 'B')
+        || setweight(to_tsvector('english', NEW.name), 'C')
+        || setweight(to_tsvector('english', NEW.description), 'D')
+    WHERE m.restaurant_id = NEW.id;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER api_restaurant_search_vector ON api_restaurant;
+CREATE TRIGGER api_restaurant_search_vector
+AFTER UPDATE OF name, description ON api_restaurant
+FOR EACH ROW WHEN (OLD.name IS DISTINCT FROM NEW.name OR OLD.description IS DISTINCT FROM NEW.description)
+EXECUTE FUNCTION api_restaurant_search_vector();
+
+CREATE OR REPLACE FUNCTION api_menu_search_vector() RETURNS trigger AS $$
+BEGIN
+    SELECT setweight(to_tsvector('english', NEW.name), 'A')
+        || setweight(to_tsvector('english', NEW.description), 'B')
+        || setweight(to_tsvector('english', r.name), 'C')
+        || setweight(to_tsvector('english', r.description), 'D')
+    INTO NEW.search_vector
+    FROM api_restaurant r WHERE r.id = NEW.restaurant_id;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+ALTER TABLE api_menu DROP COLUMN search_country;
+"""
+
+
+def add_search_country(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(FORWARD)
+
+
+def remove_search_country(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(BACKWARD)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_menu_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_search_country, remove_search_country),
+    ]
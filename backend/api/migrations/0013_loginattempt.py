@@ -0,0 +1,21 @@
+# Migration to add LoginAttempt, the login rate limit shared between workers
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_menu_search_country'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoginAttempt',
+            fields=[
+                ('key', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('window_start', models.DateTimeField(db_index=True)),
+                ('attempts', models.PositiveIntegerField(default=1)),
+            ],
+        ),
+    ]
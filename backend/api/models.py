@@ -1,5 +1,9 @@
+from datetime import timedelta
+
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
-from django.db import models
+from django.db import connection, models, transaction
+from django.db.models import F
+from django.utils import timezone
 import uuid
 
 
@@ -52,10 +56,39 @@ class Restaurant(models.Model):
     description = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["country"], name="api_restaurant_country_idx"),
+        ]
+
     def __str__(self):
         return self.name
 
 
+class MenuManager(models.Manager):
+    def refresh_search_vectors(self):
+        """Fill in api_menu.search_vector and search_country where the triggers did not.
+
+        That is, rows bulk loaded with the triggers disabled. PostgreSQL only;
+        see api/migrations/0011_menu_search_vector.py and 0012_menu_search_country.py.
+        """
+        if connection.vendor != "postgresql":
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                UPDATE api_menu m SET search_vector =
+                    setweight(to_tsvector('english', m.name), 'A')
+                    || setweight(to_tsvector('english', m.description), 'B')
+                    || setweight(to_tsvector('english', r.name), 'C')
+                    || setweight(to_tsvector('english', r.description), 'D'),
+                    search_country = r.country
+                FROM api_restaurant r
+                WHERE r.id = m.restaurant_id AND m.search_vector IS NULL
+                """
+            )
+
+
 class Menu(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name="menus")
@@ -64,24 +97,120 @@ class Menu(models.Model):
     description = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = MenuManager()
+
     def __str__(self):
         return f"{self.name} - {self.restaurant.name}"
 
 
+class OrderManager(models.Manager):
+    TRANSITION_COLUMNS = ("id", "user_id", "restaurant_id", "total_amount", "status", "created_at", "version")
+
+    def transition(self, order_ids, status, country=None, version=None):
+        """Move orders to ``status`` where their current status allows it.
+
+        A conditional UPDATE without a prior read: orders in a status that
+        cannot move to ``status``, at a restaurant outside ``country`` or,
+        when ``version`` is given, at another version are left unchanged.
+        Changed orders get their version bumped and their OrderSummary row
+        updated alongside, in one statement on PostgreSQL. Returns a row of
+        TRANSITION_COLUMNS followed by the restaurant's country for every
+        order changed.
+        """
+        order_ids = list(order_ids)
+        if not order_ids:
+            return []
+        sources = self.model.TRANSITIONS[status]
+        if connection.vendor != "postgresql":
+            return self._transition_rows(order_ids, status, sources, country, version)
+
+        opts = self.model._meta
+        summary_table = OrderSummary._meta.db_table
+        id_field = opts.get_field("id")
+        where = [
+            f"id IN ({', '.join(['%s'] * len(order_ids))})",
+            f"status IN ({', '.join(['%s'] * len(sources))})",
+        ]
+        params = [status]
+        params += [id_field.get_db_prep_value(order_id, connection) for order_id in order_ids]
+        params += sources
+        if version is not None:
+            where.append("version = %s")
+            params.append(version)
+        if country is not None:
+            where.append(f"restaurant_id IN (SELECT id FROM {Restaurant._meta.db_table} WHERE country = %s)")
+            params.append(country)
+        columns = ", ".join(self.TRANSITION_COLUMNS)
+        country_column = f"(SELECT country FROM {Restaurant._meta.db_table} WHERE id = restaurant_id)"
+        sql = (
+            f"WITH changed AS ("
+            f"UPDATE {opts.db_table} SET status = %s, version = version + 1 "
+            f"WHERE {' AND '.join(where)} RETURNING {columns}, {country_column} AS country"
+            f"), summaries AS ("
+            f"UPDATE {summary_table} SET status = changed.status, version = changed.version "
+            f"FROM changed WHERE {summary_table}.order_id = changed.id"
+            f") SELECT {columns}, country FROM changed"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def _transition_rows(self, order_ids, status, sources, country, version):
+        # Databases without data-modifying CTEs: same conditions, a few statements in a transaction.
+        # select_for_update is a no-op on SQLite, so each UPDATE repeats the conditions and the
+        # version read; a row another request changed in between matches nothing and is skipped
+        with transaction.atomic():
+            orders = self.filter(id__in=order_ids, status__in=sources)
+            if version is not None:
+                orders = orders.filter(version=version)
+            if country is not None:
+                orders = orders.filter(restaurant__country=country)
+            rows = list(
+                orders.select_for_update(of=("self",)).values_list(*self.TRANSITION_COLUMNS, "restaurant__country")
+            )
+            rows = [
+                row for row in rows
+                if orders.filter(id=row[0], version=row[6]).update(status=status, version=F("version") + 1)
+            ]
+            changed = [row[0] for row in rows]
+            OrderSummary.objects.filter(order_id__in=changed).update(status=status, version=F("version") + 1)
+        return [(*row[:4], status, row[5], row[6] + 1, row[7]) for row in rows]
+
+
 class Order(models.Model):
     STATUS_CHOICES = [
         ("pending", "Pending"),
         ("confirmed", "Confirmed"),
+        ("preparing", "Preparing"),
+        ("delivered", "Delivered"),
         ("cancelled", "Cancelled"),
     ]
+    # Target status -> statuses an order can move to it from; delivered and cancelled are final
+    TRANSITIONS = {
+        "confirmed": ("pending",),
+        "preparing": ("confirmed",),
+        "delivered": ("preparing",),
+        "cancelled": ("pending", "confirmed", "preparing"),
+    }
 
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="orders")
     restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name="orders")
     total_amount = models.DecimalField(max_digits=10, decimal_places=2)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    # Bumped by every status change; clients pass it back to change an order only if nobody else has
+    version = models.PositiveIntegerField(default=0, db_default=0)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = OrderManager()
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of the orders list (newest first)
+            models.Index(fields=["-created_at", "-id"], name="api_order_created_idx"),
+            models.Index(fields=["restaurant", "-created_at", "-id"], name="api_order_rest_created_idx"),
+        ]
+
     def __str__(self):
         return f"Order {self.id} - {self.user.email}"
 
@@ -97,6 +226,33 @@ class OrderItem(models.Model):
         return f"{self.quantity}x {self.menu.name}"
 
 
+class OrderSummary(models.Model):
+    """Denormalized read model behind GET /api/orders (see api/order_summaries.py)."""
+
+    order = models.OneToOneField(Order, on_delete=models.CASCADE, primary_key=True, related_name="summary")
+    user_id = models.UUIDField()
+    user_email = models.EmailField()
+    user_name = models.CharField(max_length=255)
+    restaurant_id = models.UUIDField()
+    restaurant_name = models.CharField(max_length=255)
+    restaurant_country = models.CharField(max_length=100)
+    total_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    version = models.PositiveIntegerField(default=0, db_default=0)
+    created_at = models.DateTimeField()
+    # [{"itemId", "name", "qty", "price"}, ...] exactly as the API returns them
+    items = models.JSONField(default=list)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-created_at", "-order"], name="api_ordersum_created_idx"),
+            models.Index(fields=["restaurant_country", "-created_at", "-order"], name="api_ordersum_country_idx"),
+        ]
+
+    def __str__(self):
+        return f"Summary of order {self.order_id}"
+
+
 class PaymentMethod(models.Model):
     TYPE_CHOICES = [
         ("credit_card", "Credit Card"),
@@ -113,6 +269,43 @@ class PaymentMethod(models.Model):
         return f"{self.type} ending in {self.card_last4}"
 
 
+class CartItemManager(models.Manager):
+    def add_quantities(self, user_id, rows):
+        """Upsert cart rows, adding to the quantity of rows that already exist.
+
+        ``rows`` is a list of (menu_id, restaurant_id, quantity, price). Runs as
+        one INSERT ... ON CONFLICT (user, menu) DO UPDATE statement and returns
+        (id, menu_id, quantity) for every affected row.
+        """
+        if not rows:
+            return []
+        opts = self.model._meta
+        field = opts.get_field
+        now = timezone.now()
+        params = []
+        for menu_id, restaurant_id, quantity, price in rows:
+            params += [
+                field("id").get_db_prep_value(uuid.uuid4(), connection),
+                field("user").get_db_prep_value(user_id, connection),
+                field("menu").get_db_prep_value(menu_id, connection),
+                field("restaurant").get_db_prep_value(restaurant_id, connection),
+                quantity,
+                field("price").get_db_prep_value(price, connection),
+                field("created_at").get_db_prep_value(now, connection),
+            ]
+        values = ", ".join(["(%s, %s, %s, %s, %s, %s, %s)"] * len(rows))
+        sql = (
+            f"INSERT INTO {opts.db_table} (id, user_id, menu_id, restaurant_id, quantity, price, created_at) "
+            f"VALUES {values} "
+            f"ON CONFLICT (user_id, menu_id) DO UPDATE SET "
+            f"quantity = {opts.db_table}.quantity + EXCLUDED.quantity, price = EXCLUDED.price "
+            f"RETURNING id, menu_id, quantity"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [(uuid.UUID(str(id_)), uuid.UUID(str(menu_id)), quantity) for id_, menu_id, quantity in cursor.fetchall()]
+
+
 class CartItem(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="cart_items")
@@ -122,5 +315,74 @@ class CartItem(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = CartItemManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "menu"], name="api_cartitem_user_menu_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["user", "-created_at"], name="api_cartitem_user_created_idx"),
+        ]
+
     def __str__(self):
         return f"{self.quantity}x {self.menu.name} (Cart - {self.user.email})"
+
+
+class AuthSession(models.Model):
+    key = models.CharField(max_length=64, primary_key=True)
+    data = models.JSONField()
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"Session {self.key[:8]} (expires {self.expires_at})"
+
+
+class LoginAttemptManager(models.Manager):
+    def record(self, key, window):
+        """Count one login attempt for ``key`` and return the attempts in its window.
+
+        Windows are fixed: the first attempt after one has ended starts a new
+        one. Runs as one INSERT ... ON CONFLICT (key) DO UPDATE statement, so
+        concurrent attempts from any process are all counted.
+        """
+        opts = self.model._meta
+        prep = opts.get_field("window_start").get_db_prep_value
+        now = timezone.now()
+        expired = prep(now - timedelta(seconds=window), connection)
+        sql = (
+            f"INSERT INTO {opts.db_table} (key, window_start, attempts) VALUES (%s, %s, 1) "
+            f"ON CONFLICT (key) DO UPDATE SET "
+            f"attempts = CASE WHEN {opts.db_table}.window_start <= %s THEN 1 ELSE {opts.db_table}.attempts + 1 END, "
+            f"window_start = CASE WHEN {opts.db_table}.window_start <= %s "
+            f"THEN EXCLUDED.window_start ELSE {opts.db_table}.window_start END "
+            f"RETURNING attempts"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [key, prep(now, connection), expired, expired])
+            return cursor.fetchone()[0]
+
+    def purge_expired(self, window):
+        removed, _ = self.filter(window_start__lte=timezone.now() - timedelta(seconds=window)).delete()
+        return removed
+
+
+class LoginAttempt(models.Model):
+    # Login attempts per email digest, shared by every worker (see fastapi_app/auth.py)
+    key = models.CharField(max_length=64, primary_key=True)
+    window_start = models.DateTimeField(db_index=True)
+    attempts = models.PositiveIntegerField(default=1)
+
+    objects = LoginAttemptManager()
+
+    def __str__(self):
+        return f"Login attempts {self.key[:8]} ({self.attempts} since {self.window_start})"
+
+
+class CatalogVersion(models.Model):
+    # Single row bumped whenever a Restaurant or Menu changes (see api/signals.py)
+    id = models.PositiveSmallIntegerField(primary_key=True, default=1)
+    version = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"Catalog v{self.version}"
@@ -0,0 +1,81 @@
+from .models import Order, OrderSummary
+
+SUMMARY_FIELDS = [
+    "user_id",
+    "user_email",
+    "user_name",
+    "restaurant_id",
+    "restaurant_name",
+    "restaurant_country",
+    "total_amount",
+    "status",
+    "version",
+    "created_at",
+    "items",
+]
+
+
+def summary_item(menu_id, name, quantity, price):
+    return {"itemId": str(menu_id), "name": name, "qty": quantity, "price": float(price)}
+
+
+def build_summary(order, user, restaurant, items):
+    """Build (unsaved) the OrderSummary of ``order``; ``items`` come from summary_item()."""
+    return OrderSummary(
+        order=order,
+        user_id=user.id,
+        user_email=user.email,
+        user_name=user.name,
+        restaurant_id=restaurant.id,
+        restaurant_name=restaurant.name,
+        restaurant_country=restaurant.country,
+        total_amount=order.total_amount,
+        status=order.status,
+        version=order.version,
+        created_at=order.created_at,
+        items=items,
+    )
+
+
+def summarize(order):
+    """Build the summary of an Order loaded with user, restaurant and items__menu."""
+    items = [
+        summary_item(item.menu_id, item.menu.name, item.quantity, item.price)
+        for item in order.items.all()
+    ]
+    return build_summary(order, order.user, order.restaurant, items)
+
+
+def _upsert(orders):
+    OrderSummary.objects.bulk_create(
+        [summarize(order) for order in orders],
+        update_conflicts=True,
+        unique_fields=["order"],
+        update_fields=SUMMARY_FIELDS,
+    )
+
+
+def _summarized_orders():
+    return Order.objects.select_related("user", "restaurant").prefetch_related("items__menu")
+
+
+def refresh(order_ids):
+    """Rewrite the summaries of ``order_ids``, e.g. after an edit in the admin."""
+    _upsert(_summarized_orders().filter(pk__in=order_ids))
+
+
+def rebuild(batch_size=1000, log=None):
+    """Upsert the summary of every order, walking the table in primary key batches."""
+    orders = _summarized_orders().order_by("pk")
+    last_pk = None
+    total = 0
+    while True:
+        batch = orders if last_pk is None else orders.filter(pk__gt=last_pk)
+        batch = list(batch[:batch_size])
+        if not batch:
+            return total
+        _upsert(batch)
+        last_pk = batch[-1].pk
+        total += len(batch)
+        if log:
+            log(f"{total} orders summarized")
@@ -0,0 +1,46 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from .models import CatalogVersion, Menu, OrderSummary, Restaurant, User
+
+# Sent after the shared catalog version has been bumped; in-process caches
+# listen to it so the writing process sees its own change immediately.
+catalog_changed = Signal()
+
+
+def bump_catalog_version():
+    updated = CatalogVersion.objects.filter(id=1).update(version=F("version") + 1)
+    if not updated:
+        CatalogVersion.objects.get_or_create(id=1, defaults={"version": 1})
+    transaction.on_commit(lambda: catalog_changed.send(sender=CatalogVersion))
+
+
+@receiver(post_save, sender=Restaurant)
+@receiver(post_delete, sender=Restaurant)
+@receiver(post_save, sender=Menu)
+@receiver(post_delete, sender=Menu)
+def catalog_modified(sender, **kwargs):
+    bump_catalog_version()
+
+
+# OrderSummary rows copy the restaurant's name and country and the user's
+# email and name; edits to those are copied over so the order list and its
+# country scoping stay right.
+@receiver(post_save, sender=Restaurant)
+def restaurant_saved(sender, instance, created, raw=False, **kwargs):
+    if created or raw:
+        return
+    OrderSummary.objects.filter(restaurant_id=instance.id).exclude(
+        restaurant_name=instance.name, restaurant_country=instance.country
+    ).update(restaurant_name=instance.name, restaurant_country=instance.country)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if created or raw or (update_fields is not None and not {"email", "name"} & set(update_fields)):
+        return
+    OrderSummary.objects.filter(user_id=instance.id).exclude(
+        user_email=instance.email, user_name=instance.name
+    ).update(user_email=instance.email, user_name=instance.name)
@@ -0,0 +1,339 @@
+"""Deterministic synthetic data for load testing (``seed_data --orders ...``).
+
+The same arguments and seed always produce the same rows, ids included.
+
+On PostgreSQL each table is streamed in with COPY. The secondary indexes and
+foreign keys of the loaded tables are dropped for the duration of the load
+and rebuilt once at the end, which is much cheaper than maintaining them row
+by row. Other databases fall back to batched INSERTs.
+
+Orders are generated in fixed-size chunks, each with its own seed and its own
+transaction, so the rows do not depend on ``workers`` and an interrupted load
+only ever leaves whole orders behind. With ``workers`` > 1 the chunks are
+spread over that many processes, each with its own database connection.
+
+All synthetic users share one password hash, so creating them costs a single
+hash regardless of --users.
+"""
+import csv
+import io
+import json
+import multiprocessing
+import random
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.db import connection, connections, transaction
+from django.utils import timezone
+
+from .models import Menu, Order, OrderItem, OrderSummary, Restaurant, User
+
+PASSWORD = "loadtest123"
+
+COUNTRIES = ["India", "USA", "UK", "Canada", "Germany", "France", "Japan", "Brazil", "Australia", "Mexico"]
+
+CUISINES = [
+    ("Indian", ["Curry", "Biryani", "Tikka", "Naan", "Dosa", "Korma", "Samosa", "Dal"]),
+    ("Italian", ["Pizza", "Pasta", "Risotto", "Lasagna", "Gnocchi", "Calzone", "Tiramisu"]),
+    ("American", ["Burger", "Steak", "Wings", "Fries", "Hot Dog", "Ribs", "Milkshake"]),
+    ("British", ["Fish & Chips", "Pie", "Sausage", "Pudding", "Roast", "Scotch Egg"]),
+    ("Japanese", ["Sushi", "Ramen", "Tempura", "Udon", "Teriyaki", "Gyoza"]),
+    ("Mexican", ["Taco", "Burrito", "Quesadilla", "Enchilada", "Nachos", "Churros"]),
+]
+ADJECTIVES = ["Classic", "Spicy", "Smoky", "Crispy", "Grilled", "Golden", "Fresh", "Royal", "Rustic", "Loaded"]
+INGREDIENTS = [
+    "chicken", "beef", "lamb", "paneer", "prawns", "mushrooms", "cheese", "garlic",
+    "tomato", "basil", "chili", "lemon", "butter", "rice", "potatoes", "avocado",
+]
+PLACES = ["Corner", "Street", "Harbour", "Garden", "Market", "Station", "Hill", "River"]
+KINDS = ["Kitchen", "House", "Grill", "Bistro", "Diner", "Cafe", "Canteen", "Tavern"]
+
+# Status mix of generated orders
+STATUSES = ["confirmed"] * 8 + ["pending", "cancelled"]
+
+ORDER_CHUNK_SIZE = 100_000
+
+# Version 4 / RFC 4122 variant bits of a random UUID
+_UUID_CLEAR = ~((0xF000 << 64) | (0xC000 << 48))
+_UUID_SET = (0x4000 << 64) | (0x8000 << 48)
+
+
+def country_names(count):
+    return [COUNTRIES[i] if i < len(COUNTRIES) else f"Country {i + 1}" for i in range(count)]
+
+
+def _uuid(rng):
+    # Formatted by hand: building uuid.UUID objects dominates the run time
+    h = "%032x" % (rng.getrandbits(128) & _UUID_CLEAR | _UUID_SET)
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+
+def _cents(amount):
+    return f"{amount // 100}.{amount % 100:02d}"
+
+
+class _Writer:
+    """Buffers rows for one table and writes them in batches.
+
+    Rows hold values in ``columns`` order: strings for ids, decimals and
+    timestamps, and plain Python objects for JSON columns.
+    """
+
+    def __init__(self, model, columns, batch_size):
+        self.table = model._meta.db_table
+        self.columns = columns
+        self.batch_size = batch_size
+        self.copy = connection.vendor == "postgresql"
+        by_column = {field.column: field for field in model._meta.concrete_fields}
+        fields = [by_column[column] for column in columns]
+        self.json = [i for i, field in enumerate(fields) if field.get_internal_type() == "JSONField"]
+        self.prep = [field.get_db_prep_value for field in fields]
+        self.rows = []
+
+    def add(self, row):
+        self.rows.append(row)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        with connection.cursor() as cursor:
+            if self.copy:
+                rows = self.rows
+                if self.json:
+                    rows = [list(row) for row in rows]
+                    for row in rows:
+                        for i in self.json:
+                            row[i] = json.dumps(row[i])
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(rows)
+                buffer.seek(0)
+                cursor.copy_expert(
+                    f"COPY {self.table} ({', '.join(self.columns)}) FROM STDIN WITH (FORMAT csv)", buffer
+                )
+            else:
+                # Raw INSERTs rather than bulk_create, which would overwrite auto_now_add timestamps
+                cursor.executemany(
+                    f"INSERT INTO {self.table} ({', '.join(self.columns)}) "
+                    f"VALUES ({', '.join(['%s'] * len(self.columns))})",
+                    [[prep(value, connection) for prep, value in zip(self.prep, row)] for row in self.rows],
+                )
+        self.rows = []
+
+
+@contextmanager
+def _bulk_load(models):
+    """Drop the secondary indexes and foreign keys of ``models``, and disable their triggers, while loading."""
+    if connection.vendor != "postgresql":
+        yield
+        return
+    tables = [model._meta.db_table for model in models]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT conrelid::regclass::text, conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE contype = 'f' AND conrelid::regclass::text = ANY(%s)",
+            [tables],
+        )
+        constraints = cursor.fetchall()
+        cursor.execute(
+            "SELECT indexname, indexdef FROM pg_indexes WHERE tablename = ANY(%s) AND indexname NOT IN "
+            "(SELECT conname FROM pg_constraint WHERE contype IN ('p', 'u'))",
+            [tables],
+        )
+        indexes = cursor.fetchall()
+        for table, name, _ in constraints:
+            cursor.execute(f'ALTER TABLE {table} DROP CONSTRAINT "{name}"')
+        for name, _ in indexes:
+            cursor.execute(f'DROP INDEX "{name}"')
+        for table in tables:
+            cursor.execute(f"ALTER TABLE {table} DISABLE TRIGGER USER")
+    try:
+        yield
+    finally:
+        # The menu search vectors are filled in one statement rather than by a trigger per row
+        Menu.objects.refresh_search_vectors()
+        with connection.cursor() as cursor:
+            for table in tables:
+                cursor.execute(f"ALTER TABLE {table} ENABLE TRIGGER USER")
+            for _, definition in indexes:
+                cursor.execute(definition)
+            for table, name, definition in constraints:
+                cursor.execute(f'ALTER TABLE {table} ADD CONSTRAINT "{name}" {definition}')
+            # Fresh statistics, for the planner and for the estimates /api/search uses
+            for table in tables:
+                cursor.execute(f"ANALYZE {table}")
+
+
+def generate(
+    restaurants=0, menus_per_restaurant=8, users=0, orders=0, countries=3, seed=0,
+    batch_size=10000, workers=1, log=None,
+):
+    """Add synthetic rows on top of whatever the database already holds.
+
+    Orders are spread over every user and restaurant in the database (fixtures
+    included), each user ordering from restaurants in their own country.
+    """
+    log = log or (lambda message: None)
+    rng = random.Random(seed)
+    now = str(timezone.now())
+    names = country_names(countries)
+
+    with _bulk_load([Restaurant, Menu, User, Order, OrderItem, OrderSummary]):
+        with transaction.atomic():
+            if restaurants:
+                log(f"Creating {restaurants} restaurants with {menus_per_restaurant} menu items each...")
+                _generate_catalog(rng, restaurants, menus_per_restaurant, names, now, batch_size)
+            if users:
+                log(f"Creating {users} users (password: {PASSWORD})...")
+                _generate_users(rng, users, names, now, batch_size)
+        if orders:
+            log(f"Creating {orders} orders with {workers} worker(s)...")
+            _generate_orders(orders, seed, now, batch_size, workers, log)
+        log("Rebuilding indexes...")
+
+
+def _generate_catalog(rng, count, menus_per_restaurant, names, now, batch_size):
+    restaurant_writer = _Writer(Restaurant, ["id", "name", "country", "description", "created_at"], batch_size)
+    menu_writer = _Writer(Menu, ["id", "restaurant_id", "name", "price", "description", "created_at"], batch_size)
+    for i in range(count):
+        cuisine, dishes = rng.choice(CUISINES)
+        restaurant_id = _uuid(rng)
+        restaurant_writer.add((
+            restaurant_id,
+            f"{rng.choice(PLACES)} {cuisine} {rng.choice(KINDS)} {i + 1}",
+            names[i % len(names)],
+            f"{cuisine} food with {rng.choice(INGREDIENTS)} and {rng.choice(INGREDIENTS)} specialties",
+            now,
+        ))
+        for _ in range(menus_per_restaurant):
+            dish = rng.choice(dishes)
+            menu_writer.add((
+                _uuid(rng),
+                restaurant_id,
+                f"{rng.choice(ADJECTIVES)} {dish}",
+                _cents(rng.randrange(199, 4999)),
+                f"{dish} with {rng.choice(INGREDIENTS)} and {rng.choice(INGREDIENTS)}",
+                now,
+            ))
+    restaurant_writer.flush()
+    menu_writer.flush()
+
+
+def _generate_users(rng, count, names, now, batch_size):
+    password = make_password(PASSWORD)
+    writer = _Writer(
+        User,
+        ["id", "password", "is_superuser", "email", "name", "role", "country", "is_active", "is_staff", "created_at"],
+        batch_size,
+    )
+    for i in range(count):
+        writer.add((
+            _uuid(rng),
+            password,
+            False,
+            f"user{i + 1}@load.test",
+            f"Load User {i + 1}",
+            "manager" if rng.random() < 0.02 else "member",
+            names[rng.randrange(len(names))],
+            True,
+            False,
+            now,
+        ))
+    writer.flush()
+
+
+def _generate_orders(count, seed, now, batch_size, workers, log):
+    chunks = [
+        (seed, index, min(ORDER_CHUNK_SIZE, count - start), now, batch_size)
+        for index, start in enumerate(range(0, count, ORDER_CHUNK_SIZE))
+    ]
+    global _lookup
+    _lookup = None
+    done = 0
+    if workers > 1:
+        # Workers open their own connections; forking a live one is unsafe
+        connections.close_all()
+        pool = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn"), initializer=django.setup
+        )
+        with pool:
+            for written in pool.map(_write_order_chunk, chunks):
+                done += written
+                log(f"  {done} orders")
+    else:
+        for chunk in chunks:
+            done += _write_order_chunk(chunk)
+            log(f"  {done} orders")
+
+
+# Per process: built by the first chunk a process writes
+_lookup = None
+
+
+def _order_lookup():
+    """Users, and restaurants with their menus grouped by country."""
+    # Read back in a stable order so the same seed picks the same rows
+    menus = {}
+    rows = Menu.objects.order_by("restaurant_id", "name", "id").values_list("id", "restaurant_id", "name", "price")
+    for menu_id, restaurant_id, name, price in rows.iterator():
+        menus.setdefault(restaurant_id, []).append((str(menu_id), name, int(price * 100)))
+    restaurants = {}
+    rows = Restaurant.objects.order_by("name", "id").values_list("id", "name", "country")
+    for restaurant_id, name, country in rows.iterator():
+        if restaurant_id in menus:
+            restaurants.setdefault(country, []).append((str(restaurant_id), name, country, menus[restaurant_id]))
+    everywhere = [restaurant for country in sorted(restaurants) for restaurant in restaurants[country]]
+    rows = User.objects.order_by("email").values_list("id", "email", "name", "country")
+    users = [(str(user_id), email, name, country) for user_id, email, name, country in rows.iterator()]
+    if not everywhere or not users:
+        raise ValueError("Orders need at least one user and one restaurant with menu items")
+    return users, restaurants, everywhere
+
+
+def _write_order_chunk(chunk):
+    global _lookup
+    seed, index, count, now, batch_size = chunk
+    if _lookup is None:
+        _lookup = _order_lookup()
+    users, restaurants, everywhere = _lookup
+    rng = random.Random(f"{seed}:orders:{index}")
+    start = datetime.fromisoformat(now)
+    year = 365 * 86400
+
+    order_writer = _Writer(Order, ["id", "user_id", "restaurant_id", "total_amount", "status", "created_at"], batch_size)
+    item_writer = _Writer(OrderItem, ["id", "order_id", "menu_id", "quantity", "price"], batch_size)
+    summary_writer = _Writer(
+        OrderSummary,
+        ["order_id", "user_id", "user_email", "user_name", "restaurant_id", "restaurant_name",
+         "restaurant_country", "total_amount", "status", "created_at", "items"],
+        batch_size,
+    )
+    with transaction.atomic():
+        for _ in range(count):
+            user_id, email, user_name, country = users[rng.randrange(len(users))]
+            choices = restaurants.get(country) or everywhere
+            restaurant_id, restaurant_name, restaurant_country, restaurant_menus = choices[rng.randrange(len(choices))]
+            order_id = _uuid(rng)
+            created_at = str(start - timedelta(seconds=rng.randrange(year)))
+            order_status = STATUSES[rng.randrange(len(STATUSES))]
+            total = 0
+            items = []
+            for menu_id, name, price in rng.sample(restaurant_menus, min(len(restaurant_menus), 1 + rng.randrange(4))):
+                quantity = 1 + rng.randrange(3)
+                total += price * quantity
+                item_writer.add((_uuid(rng), order_id, menu_id, quantity, _cents(price)))
+                items.append({"itemId": menu_id, "name": name, "qty": quantity, "price": price / 100})
+            total = _cents(total)
+            order_writer.add((order_id, user_id, restaurant_id, total, order_status, created_at))
+            summary_writer.add((
+                order_id, user_id, email, user_name, restaurant_id, restaurant_name,
+                restaurant_country, total, order_status, created_at, items,
+            ))
+        order_writer.flush()
+        item_writer.flush()
+        summary_writer.flush()
+    return count
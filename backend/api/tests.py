@@ -0,0 +1,493 @@
+import hashlib
+import uuid
+from datetime import timedelta
+from unittest import mock, skipUnless
+
+import orjson
+from django.db import IntegrityError, connection, transaction
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from fastapi import HTTPException
+
+from fastapi_app.auth import DatabaseLoginRateLimiter, LoginRateLimiter
+from fastapi_app.catalog_cache import CatalogCache
+from fastapi_app.search import MemorySearch, PostgresSearch
+from fastapi_app.sessions import DatabaseSessionStore, MemorySessionStore
+from fastapi_app.tokens import RevocationList, TokenSigner
+
+from .models import AuthSession, CartItem, LoginAttempt, Menu, Order, OrderSummary, Restaurant, User
+from .order_summaries import refresh
+
+
+@skipUnless(connection.vendor == "postgresql", "checks PostgreSQL query plans")
+class HotQueryIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("member@example.com", "secret", name="Member", country="India")
+        cls.restaurant = Restaurant.objects.create(name="Spice Route", country="India")
+        cls.menu = Menu.objects.create(restaurant=cls.restaurant, name="Dal Makhani", price=250)
+
+    def setUp(self):
+        # The test tables are tiny: without this the planner scans them (or
+        # bitmap-scans and sorts them) whatever the indexes
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute("SET LOCAL enable_bitmapscan = off")
+
+    def test_restaurants_by_country_use_country_index(self):
+        plan = Restaurant.objects.filter(country="India").explain()
+        self.assertIn("api_restaurant_country_idx", plan)
+
+    def test_cart_listing_uses_user_created_index(self):
+        plan = CartItem.objects.filter(user_id=self.user.id).order_by("-created_at").explain()
+        self.assertIn("api_cartitem_user_created_idx", plan)
+        self.assertNotIn("Sort", plan)
+
+    def test_cart_rows_are_unique_per_user_and_menu(self):
+        CartItem.objects.create(user=self.user, menu=self.menu, restaurant=self.restaurant, quantity=1, price=250)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            CartItem.objects.create(user=self.user, menu=self.menu, restaurant=self.restaurant, quantity=2, price=250)
+
+    def test_add_quantities_upserts_on_the_unique_constraint(self):
+        row = (self.menu.id, self.restaurant.id, 1, self.menu.price)
+        CartItem.objects.add_quantities(self.user.id, [row])
+        [(_, _, quantity)] = CartItem.objects.add_quantities(self.user.id, [row])
+        self.assertEqual(quantity, 2)
+        self.assertEqual(CartItem.objects.filter(user=self.user).count(), 1)
+
+
+class CartQueryCountTests(TestCase):
+    """Pin the statements behind the cart write endpoints (fastapi_app.main)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.member = User.objects.create_user("member@example.com", "secret", name="Member", country="India")
+        cls.restaurant = Restaurant.objects.create(name="Spice Route", country="India")
+        cls.menu = Menu.objects.create(restaurant=cls.restaurant, name="Dal Makhani", price=250)
+        cls.menus = [
+            Menu.objects.create(restaurant=cls.restaurant, name=f"Dish {i}", price=100 + i) for i in range(6)
+        ]
+
+    def setUp(self):
+        from fastapi_app import main
+
+        self.main = main
+        self.user = {"id": self.member.id, "role": "member", "country": "India"}
+
+    def add_to_cart(self, quantity):
+        # The handler itself, on this thread's connection rather than the DB executor's
+        request = self.main.AddToCartRequest(
+            menuId=str(self.menu.id), quantity=quantity, price=250, restaurantId=str(self.restaurant.id)
+        )
+        return self.main.add_to_cart.__wrapped__(request, self.user)
+
+    def test_add_inserts_in_two_queries(self):
+        # The menu with its restaurant, then the upsert
+        with self.assertNumQueries(2):
+            item = self.add_to_cart(1)
+        self.assertEqual(item["quantity"], 1)
+
+    def test_conflicting_add_updates_in_two_queries(self):
+        self.add_to_cart(1)
+        with self.assertNumQueries(2):
+            item = self.add_to_cart(2)
+        self.assertEqual(item["quantity"], 3)
+        self.assertEqual(CartItem.objects.get(user=self.member).quantity, 3)
+
+    def test_remove_is_one_query(self):
+        item = self.add_to_cart(1)
+        with self.assertNumQueries(1):
+            self.main.remove_from_cart.__wrapped__(item["id"], self.user)
+        self.assertFalse(CartItem.objects.filter(user=self.member).exists())
+
+    def cart(self):
+        return dict(CartItem.objects.filter(user=self.member).values_list("menu__name", "quantity"))
+
+    def update_cart(self, deltas):
+        operations = [self.main.CartOperation(menuId=menu.id, quantityDelta=delta) for menu, delta in deltas]
+        return self.main.update_cart.__wrapped__(operations, self.user)
+
+    def test_patch_query_count_does_not_depend_on_the_number_of_operations(self):
+        menus = self.menus
+        self.update_cart([(menus[0], 1)])
+        # One operation that empties a row, so both runs go through the delete
+        with CaptureQueriesContext(connection) as one_operation:
+            self.update_cart([(menus[0], -1)])
+        self.assertEqual(self.cart(), {})
+
+        self.update_cart([(menus[0], 2), (menus[1], 2), (menus[2], 2), (menus[3], 2)])
+        with self.assertNumQueries(len(one_operation)):
+            self.update_cart([
+                (menus[0], -2), (menus[1], 1), (menus[2], -1), (menus[3], -5),
+                (menus[4], 3), (menus[5], 1), (menus[5], -1), (menus[1], 1),
+            ])
+        self.assertEqual(self.cart(), {"Dish 1": 4, "Dish 2": 1, "Dish 4": 3})
+
+    def test_checkout_query_count_does_not_depend_on_the_number_of_items(self):
+        manager = User.objects.create_user(
+            "manager@example.com", "secret", name="Manager", role="manager", country="India"
+        )
+        user = {"id": manager.id, "role": "manager", "country": "India", "email": manager.email, "name": manager.name}
+
+        def checkout(menus):
+            rows = [(menu.id, self.restaurant.id, 2, menu.price) for menu in menus]
+            CartItem.objects.add_quantities(manager.id, rows)
+            return self.main.checkout_cart.__wrapped__(None, user)
+
+        with CaptureQueriesContext(connection) as one_item:
+            checkout(self.menus[:1])
+        with self.assertNumQueries(len(one_item)):
+            checkout(self.menus)
+        self.assertFalse(CartItem.objects.filter(user=manager).exists())
+        order = Order.objects.filter(user=manager).latest("created_at")
+        self.assertEqual(order.items.count(), 6)
+        summary = OrderSummary.objects.get(order=order)
+        self.assertEqual(summary.total_amount, sum(2 * menu.price for menu in self.menus))
+        self.assertEqual(sorted(item["name"] for item in summary.items), [menu.name for menu in self.menus])
+
+
+class OrderQueryCountTests(TestCase):
+    """The statements behind POST /api/orders do not grow with the number of lines."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user(
+            "manager@example.com", "secret", name="Manager", role="manager", country="India"
+        )
+        cls.restaurant = Restaurant.objects.create(name="Spice Route", country="India")
+        cls.menus = [
+            Menu.objects.create(restaurant=cls.restaurant, name=f"Dish {i}", price=100 + i) for i in range(8)
+        ]
+
+    def setUp(self):
+        from fastapi_app import main
+
+        self.main = main
+        self.user = {
+            "id": self.manager.id, "role": "manager", "country": "India",
+            "email": self.manager.email, "name": self.manager.name,
+        }
+
+    def create_order(self, menus):
+        request = self.main.CreateOrderRequest(
+            restaurantId=str(self.restaurant.id),
+            items=[self.main.OrderItemRequest(menuId=menu.id, quantity=2) for menu in menus],
+        )
+        return self.main.create_order.__wrapped__(request, self.user)
+
+    def test_query_count_does_not_depend_on_the_number_of_items(self):
+        with CaptureQueriesContext(connection) as one_item:
+            self.create_order(self.menus[:1])
+        with self.assertNumQueries(len(one_item)):
+            self.create_order(self.menus)
+        order = Order.objects.latest("created_at")
+        self.assertEqual(order.items.count(), 8)
+        self.assertEqual(order.total_amount, sum(2 * menu.price for menu in self.menus))
+        self.assertEqual(len(OrderSummary.objects.get(order=order).items), 8)
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.restaurant = Restaurant.objects.create(
+            name="Spice Route", country="India", description="North Indian curries"
+        )
+        cls.menu = Menu.objects.create(
+            restaurant=cls.restaurant, name="Chicken Tikka", price=300, description="Grilled in a tandoor"
+        )
+
+    def backends(self):
+        yield MemorySearch(lambda: 1)
+        if connection.vendor == "postgresql":
+            yield PostgresSearch()
+
+    def names(self, backend, q, country="India"):
+        return [result["name"] for result in backend.search(q, country, 20, 0)]
+
+    def test_prefixes_match_any_field(self):
+        for backend in self.backends():
+            self.assertEqual(self.names(backend, "chick"), ["Chicken Tikka"])
+            self.assertEqual(self.names(backend, "tand rout"), ["Chicken Tikka"])
+            self.assertEqual(self.names(backend, "chick", "Japan"), [])
+
+    def test_short_terms_match_whole_words(self):
+        for backend in self.backends():
+            self.assertEqual(self.names(backend, "ch"), [])
+            self.assertEqual(self.names(backend, "ti"), [])
+
+    def test_candidates_are_the_matches_with_the_smallest_ids(self):
+        for i in range(5):
+            Menu.objects.create(restaurant=self.restaurant, name=f"Chicken {i}", price=100, description="")
+        matches = sorted(str(menu_id) for menu_id in Menu.objects.values_list("id", flat=True))
+        with mock.patch("fastapi_app.search.MAX_CANDIDATES", 3):
+            for backend in self.backends():
+                results = [backend.search("chick", "India", 1, offset)[0]["id"] for offset in range(3)]
+                self.assertEqual(sorted(results), matches[:3])
+
+    @skipUnless(connection.vendor == "postgresql", "search vectors are PostgreSQL only")
+    def test_search_vectors_follow_restaurant_edits(self):
+        self.restaurant.name = "Harbour Kitchen"
+        self.restaurant.save()
+        backend = PostgresSearch()
+        self.assertEqual(self.names(backend, "harbour"), ["Chicken Tikka"])
+        self.assertEqual(self.names(backend, "route"), [])
+
+
+class OrderTransitionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.member = User.objects.create_user("member@example.com", "secret", name="Member", country="India")
+        cls.restaurant = Restaurant.objects.create(name="Spice Route", country="India")
+        cls.abroad = Restaurant.objects.create(name="Sushi Bar", country="Japan")
+
+    def setUp(self):
+        from fastapi_app import main
+
+        self.main = main
+        self.manager = {"id": self.member.id, "role": "manager", "country": "India"}
+
+    def create_order(self, status="pending", restaurant=None):
+        order = Order.objects.create(
+            user=self.member, restaurant=restaurant or self.restaurant, total_amount=250, status=status
+        )
+        refresh([order.id])
+        return order
+
+    def statuses(self, *orders):
+        current = {row[0]: row[1:] for row in Order.objects.values_list("id", "status", "version")}
+        return [current[order.id] for order in orders]
+
+    def test_fallback_changes_only_orders_meeting_the_conditions(self):
+        pending, confirmed, stale = self.create_order(), self.create_order("confirmed"), self.create_order()
+        Order.objects.filter(id=stale.id).update(version=3)
+        rows = Order.objects._transition_rows(
+            [pending.id, confirmed.id, stale.id], "confirmed", Order.TRANSITIONS["confirmed"], "India", 0
+        )
+        self.assertEqual([(row[0], row[4], row[6], row[7]) for row in rows], [(pending.id, "confirmed", 1, "India")])
+        self.assertEqual(
+            self.statuses(pending, confirmed, stale), [("confirmed", 1), ("confirmed", 0), ("pending", 3)]
+        )
+        self.assertEqual(OrderSummary.objects.get(order=pending).status, "confirmed")
+        self.assertEqual(OrderSummary.objects.get(order=confirmed).version, 0)
+
+    def test_fallback_skips_orders_outside_the_country(self):
+        order = self.create_order()
+        rows = Order.objects._transition_rows([order.id], "cancelled", Order.TRANSITIONS["cancelled"], "Japan", None)
+        self.assertEqual(rows, [])
+        self.assertEqual(self.statuses(order), [("pending", 0)])
+
+    def test_transition_changes_orders_meeting_the_conditions(self):
+        pending, delivered, stale = self.create_order(), self.create_order("delivered"), self.create_order()
+        abroad = self.create_order(restaurant=self.abroad)
+        Order.objects.filter(id=stale.id).update(version=3)
+        rows = Order.objects.transition(
+            [pending.id, delivered.id, stale.id, abroad.id], "cancelled", country="India", version=0
+        )
+        self.assertEqual([(row[0], row[4], row[6], row[7]) for row in rows], [(pending.id, "cancelled", 1, "India")])
+        self.assertEqual(
+            self.statuses(pending, delivered, stale, abroad),
+            [("cancelled", 1), ("delivered", 0), ("pending", 3), ("pending", 0)],
+        )
+        summary = OrderSummary.objects.get(order=pending)
+        self.assertEqual((summary.status, summary.version), ("cancelled", 1))
+        self.assertEqual(Order.objects.transition([pending.id], "cancelled"), [])
+
+    @skipUnless(connection.vendor == "postgresql", "one statement relies on PostgreSQL's data-modifying CTEs")
+    def test_transition_is_one_statement(self):
+        orders = [self.create_order() for _ in range(5)]
+        with self.assertNumQueries(1):
+            rows = Order.objects.transition([order.id for order in orders], "confirmed")
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(set(OrderSummary.objects.values_list("status", flat=True)), {"confirmed"})
+
+    def cancel(self, order_id, version=None):
+        request = self.main.CancelOrderRequest(version=version)
+        try:
+            return 200, orjson.loads(self.main.cancel_order.__wrapped__(order_id, request, self.manager).body)
+        except HTTPException as error:
+            return error.status_code, error.detail
+
+    def test_cancel_maps_failures_to_status_codes(self):
+        order = self.create_order()
+        self.assertEqual(self.cancel(order.id, version=1)[0], 409)
+        code, body = self.cancel(order.id, version=0)
+        self.assertEqual((code, body["status"], body["version"]), (200, "cancelled", 1))
+        self.assertEqual(self.cancel(order.id), (409, "Cannot move an order from cancelled to cancelled"))
+        self.assertEqual(self.cancel(self.create_order(restaurant=self.abroad).id)[0], 403)
+        self.assertEqual(self.cancel(uuid.uuid4()), (404, "Order not found"))
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TokenTests(TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.user = {"id": "42", "email": "member@example.com", "name": "Member", "role": "member", "country": "India"}
+
+    def signer(self, store=None):
+        if store is None:
+            store = MemorySessionStore(clock=self.clock)
+        revocations = RevocationList(store, check_interval=30, clock=self.clock)
+        return TokenSigner(3600, revocations, clock=self.clock)
+
+    def test_valid_token_carries_the_user(self):
+        signer = self.signer()
+        claims = signer.verify(signer.issue(self.user))
+        self.assertEqual(claims["user"], self.user)
+
+    def test_tampered_token_is_rejected(self):
+        signer = self.signer()
+        token = signer.issue(self.user)
+        payload, signature = token.rsplit(":", 1)
+        forged = signer.issue({**self.user, "role": "admin"}).rsplit(":", 1)[0]
+        self.assertIsNone(signer.verify(f"{payload}:{signature[::-1]}"))
+        self.assertIsNone(signer.verify(f"{forged}:{signature}"))
+
+    def test_expired_token_is_rejected(self):
+        signer = self.signer()
+        token = signer.issue(self.user)
+        self.clock.now += 3599
+        self.assertIsNotNone(signer.verify(token))
+        self.clock.now += 1
+        self.assertIsNone(signer.verify(token))
+
+    def test_revoked_token_is_rejected(self):
+        signer = self.signer()
+        token, other = signer.issue(self.user), signer.issue(self.user)
+        signer.revoke(token)
+        self.assertIsNone(signer.verify(token))
+        self.assertIsNotNone(signer.verify(other))
+
+    def test_revocation_reaches_other_workers_through_the_database(self):
+        # Two workers: each has its own revocation list over the shared store
+        worker_a, worker_b = self.signer(DatabaseSessionStore()), self.signer(DatabaseSessionStore())
+        token = worker_a.issue(self.user)
+        jti = worker_b.verify(token)["jti"]
+        self.assertTrue(worker_b.revocations.needs_check(jti))
+        self.assertFalse(worker_b.revocations.check(jti))
+        self.assertFalse(worker_b.revocations.needs_check(jti))
+
+        worker_a.revoke(token)
+        # Not looked up again until the check interval has passed
+        self.assertIsNotNone(worker_b.verify(token))
+        self.clock.now += 30
+        self.assertTrue(worker_b.revocations.needs_check(jti))
+        self.assertTrue(worker_b.revocations.check(jti))
+        self.assertIsNone(worker_b.verify(token))
+
+
+class MemorySessionStoreTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.store = MemorySessionStore(max_size=2, clock=self.clock)
+
+    def test_entries_expire_after_their_ttl(self):
+        self.store.set("a", {"id": 1}, 10)
+        self.clock.now += 9
+        self.assertEqual(self.store.get("a"), {"id": 1})
+        self.clock.now += 1
+        self.assertIsNone(self.store.get("a"))
+        self.assertEqual(len(self.store), 0)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        self.store.set("a", 1, 60)
+        self.store.set("b", 2, 60)
+        self.store.get("a")
+        self.store.set("c", 3, 60)
+        self.assertEqual((self.store.get("a"), self.store.get("b"), self.store.get("c")), (1, None, 3))
+
+    def test_purge_expired_removes_only_expired_entries(self):
+        self.store.set("a", 1, 10)
+        self.store.set("b", 2, 30)
+        # Renewed: its first expiry must not remove it
+        self.store.set("a", 1, 60)
+        self.clock.now += 30
+        self.assertEqual(self.store.purge_expired(), 1)
+        self.assertEqual((self.store.get("a"), self.store.get("b")), (1, None))
+        self.store.delete("a")
+        self.assertEqual(len(self.store), 0)
+
+
+class DatabaseSessionStoreTests(TestCase):
+    def setUp(self):
+        self.store = DatabaseSessionStore()
+
+    def test_sessions_are_stored_under_a_hash_of_the_token(self):
+        self.store.set("token", {"id": 1}, 60)
+        self.assertEqual(self.store.get("token"), {"id": 1})
+        self.assertIsNone(self.store.get("other"))
+        self.assertEqual(
+            list(AuthSession.objects.values_list("key", flat=True)), [hashlib.sha256(b"token").hexdigest()]
+        )
+        self.store.set("token", {"id": 2}, 60)
+        self.assertEqual((self.store.get("token"), len(self.store)), ({"id": 2}, 1))
+        self.store.delete("token")
+        self.assertIsNone(self.store.get("token"))
+
+    def test_expired_sessions_are_ignored_and_purged(self):
+        self.store.set("old", {"id": 1}, 60)
+        self.store.set("new", {"id": 2}, 60)
+        AuthSession.objects.filter(key=hashlib.sha256(b"old").hexdigest()).update(
+            expires_at=timezone.now() - timedelta(seconds=1)
+        )
+        self.assertIsNone(self.store.get("old"))
+        self.assertEqual(len(self.store), 1)
+        self.assertEqual(self.store.purge_expired(), 1)
+        self.assertEqual(self.store.get("new"), {"id": 2})
+
+
+class LoginRateLimiterTests(TestCase):
+    def test_memory_limit_slides_with_the_window(self):
+        clock = FakeClock()
+        limiter = LoginRateLimiter(max_attempts=2, window=60, clock=clock)
+        self.assertEqual([limiter.allow("a"), limiter.allow("a"), limiter.allow("a")], [True, True, False])
+        self.assertTrue(limiter.allow("b"))
+        clock.now += 60
+        self.assertTrue(limiter.allow("a"))
+
+    def test_database_limit_is_shared_between_workers(self):
+        workers = [DatabaseLoginRateLimiter(max_attempts=3, window=60) for _ in range(2)]
+        allowed = [worker.allow("a") for worker in workers + workers]
+        self.assertEqual(allowed, [True, True, True, False])
+        self.assertTrue(workers[0].allow("b"))
+        self.assertEqual(LoginAttempt.objects.get(key=hashlib.sha256(b"a").hexdigest()).attempts, 4)
+
+    def test_database_window_restarts_and_old_rows_are_purged(self):
+        clock = FakeClock()
+        limiter = DatabaseLoginRateLimiter(max_attempts=1, window=60, clock=clock)
+        self.assertEqual([limiter.allow("a"), limiter.allow("a")], [True, False])
+        limiter.allow("b")
+        LoginAttempt.objects.update(window_start=timezone.now() - timedelta(seconds=60))
+        self.assertTrue(limiter.allow("a"))
+        self.assertEqual(LoginAttempt.objects.count(), 2)
+        clock.now += 60
+        self.assertFalse(limiter.allow("a"))
+        self.assertEqual(list(LoginAttempt.objects.values_list("key", flat=True)), [hashlib.sha256(b"a").hexdigest()])
+
+
+class CatalogResponseTests(TestCase):
+    def setUp(self):
+        from fastapi_app import main
+
+        self.main = main
+        # Re-read the version on every call, as after each CATALOG_VERSION_CHECK_INTERVAL
+        patcher = mock.patch.object(main, "CATALOG_CACHE", CatalogCache(version_check_interval=0))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_catalog_version_is_read_once_per_response(self):
+        build = mock.Mock(return_value=[{"name": "Spice Route"}])
+        self.main._catalog_response(("restaurants", "India"), build)
+        with self.assertNumQueries(1):
+            response = self.main._catalog_response(("restaurants", "India"), build)
+        self.assertEqual((response.headers["X-Cache"], build.call_count), ("HIT", 1))
+        with self.assertNumQueries(1):
+            response = self.main._catalog_response(("restaurants", "India"), build, response.headers["ETag"])
+        self.assertEqual(response.status_code, 304)
@@ -0,0 +1,88 @@
+"""Shared helpers for the benchmark scripts.
+
+Benchmarks drive ``fastapi_app.main:app`` in-process through httpx's ASGI
+transport, against whatever database DJANGO_SETTINGS_MODULE points at. Seed
+it first with ``python manage.py seed_data``.
+"""
+import contextvars
+import statistics
+import time
+
+import httpx
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from fastapi_app.main import app
+
+ADMIN = ("nickfury@admin.com", "admin123")
+
+
+def make_client() -> httpx.AsyncClient:
+    transport = httpx.ASGITransport(app=app)
+    return httpx.AsyncClient(transport=transport, base_url="http://bench")
+
+
+async def login(client: httpx.AsyncClient, email: str, password: str) -> None:
+    response = await client.post("/api/auth/login", json={"email": email, "password": password})
+    response.raise_for_status()
+    client.cookies.set("auth_token", response.json()["token"])
+
+
+# Per request: a one-element list the query counter adds to. run_in_db copies
+# the context into the DB thread, so queries land on the request that made them.
+QUERY_COUNT = contextvars.ContextVar("benchmark_query_count", default=None)
+
+
+def _count_query(execute, sql, params, many, context):
+    counter = QUERY_COUNT.get()
+    if counter is not None:
+        counter[0] += 1
+    return execute(sql, params, many, context)
+
+
+def _add_counter(sender, connection, **kwargs):
+    if _count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_query)
+
+
+def install_query_counter() -> None:
+    """Count queries on every connection, including those the DB threads open later."""
+    connection_created.connect(_add_counter, weak=False)
+    for connection in connections.all(initialized_only=True):
+        _add_counter(None, connection)
+
+
+async def counted(send):
+    """Like timed(), also returning the number of SQL queries the request ran."""
+    counter = [0]
+    token = QUERY_COUNT.set(counter)
+    try:
+        response, latency = await timed(send)
+    finally:
+        QUERY_COUNT.reset(token)
+    return response, latency, counter[0]
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(latencies, elapsed):
+    return {
+        "requests": len(latencies),
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+async def timed(send):
+    start = time.perf_counter()
+    response = await send()
+    return response, time.perf_counter() - start
@@ -0,0 +1,69 @@
+"""Requests per second against one endpoint as concurrency grows.
+
+    cd backend
+    python -m benchmarks.concurrency --path /api/menus --concurrency 1,10,100,500
+
+Run it once with the default async handlers and once with ASYNC_DB=0 to
+compare against sync handlers on FastAPI's threadpool.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks.common import ADMIN, login, make_client, summarize, timed
+from fastapi_app.db import ASYNC_DB, DB_THREADS
+from fastapi_app.main import CATALOG_CACHE
+
+
+async def run_level(client, path, concurrency, total):
+    latencies = []
+    remaining = iter(range(total))
+
+    async def worker():
+        for _ in remaining:
+            response, latency = await timed(lambda: client.get(path))
+            response.raise_for_status()
+            latencies.append(latency)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - start)
+
+
+async def main(args):
+    async with make_client() as client:
+        await login(client, *ADMIN)
+        results = []
+        for level in args.concurrency:
+            total = max(args.requests, level)
+            result = {"concurrency": level, **await run_level(client, args.path, level, total)}
+            results.append(result)
+            print(
+                f"c={level:<5} rps={result['rps']:<9} p50={result['p50_ms']}ms "
+                f"p99={result['p99_ms']}ms"
+            )
+    report = {
+        "path": args.path,
+        "async_db": ASYNC_DB,
+        "db_threads": DB_THREADS,
+        "results": results,
+        "catalog_cache": CATALOG_CACHE.stats(),
+    }
+    print(f"catalog cache: {report['catalog_cache']}")
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(report, fh, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", default="/api/menus")
+    parser.add_argument(
+        "--concurrency",
+        type=lambda value: [int(v) for v in value.split(",")],
+        default=[1, 10, 50, 100, 500],
+    )
+    parser.add_argument("--requests", type=int, default=1000, help="requests per concurrency level")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    asyncio.run(main(parser.parse_args()))
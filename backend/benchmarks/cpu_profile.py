@@ -0,0 +1,98 @@
+"""CPU profile of individual endpoints, in-process.
+
+    cd backend
+    python manage.py seed_data --restaurants 200 --menus-per-restaurant 25 --users 1000 --orders 20000
+    python -m benchmarks.cpu_profile --path /api/menus --path "/api/orders?limit=500"
+    python -m benchmarks.cpu_profile --path /api/menus --output-dir profiles/
+
+Each --path is requested --requests times, one request at a time, as the
+admin user: once to measure CPU and wall time per request, then again under
+cProfile. The catalog cache is turned off so catalog endpoints build their
+body on every request.
+
+Handlers run on the DB executor and the response is serialized on the event
+loop, so DB_THREADS is forced to 1 and both threads are profiled, then
+merged. The profiler counts thread CPU time, so waits on the other thread or
+on the database do not show up. The report lists the functions with the most
+own time; --output-dir also writes a .prof file per path for pstats or
+snakeviz.
+"""
+import argparse
+import asyncio
+import cProfile
+import io
+import os
+import pstats
+import re
+import time
+
+os.environ["DB_THREADS"] = "1"
+os.environ["CATALOG_CACHE_TTL"] = "0"
+
+from benchmarks.common import ADMIN, login, make_client  # noqa: E402
+from fastapi_app.db import run_in_db  # noqa: E402
+
+WARM_UP = 3
+
+
+async def profile_path(client, path, requests):
+    # Thread CPU time, so time spent waiting on the other thread or the database is not counted
+    loop_profile = cProfile.Profile(time.thread_time)
+    db_profile = cProfile.Profile(time.thread_time)
+    for _ in range(WARM_UP):
+        (await client.get(path)).raise_for_status()
+
+    # CPU time without the profiler's overhead
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    for _ in range(requests):
+        response = await client.get(path)
+        response.raise_for_status()
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu_start
+
+    # cProfile only sees the thread that enabled it; DB_THREADS=1 makes the DB thread a single one
+    await run_in_db(db_profile.enable)
+    loop_profile.enable()
+    for _ in range(requests):
+        (await client.get(path)).raise_for_status()
+    loop_profile.disable()
+    await run_in_db(db_profile.disable)
+
+    stats = pstats.Stats(loop_profile)
+    stats.add(db_profile)
+    return stats, {
+        "cpu_ms_per_request": round(cpu / requests * 1000, 2),
+        "wall_ms_per_request": round(elapsed / requests * 1000, 2),
+        "response_bytes": len(response.content),
+    }
+
+
+async def main(args):
+    async with make_client() as client:
+        await login(client, *ADMIN)
+        for path in args.path:
+            stats, result = await profile_path(client, path, args.requests)
+            print(
+                f"{path}: cpu={result['cpu_ms_per_request']}ms/request "
+                f"wall={result['wall_ms_per_request']}ms/request bytes={result['response_bytes']}"
+            )
+            out = io.StringIO()
+            stats.stream = out
+            stats.sort_stats("tottime").print_stats(args.top)
+            print(out.getvalue().split("\n\n", 1)[-1])
+            if args.output_dir:
+                os.makedirs(args.output_dir, exist_ok=True)
+                name = re.sub(r"[^A-Za-z0-9]+", "_", path).strip("_")
+                stats.dump_stats(os.path.join(args.output_dir, f"{name}.prof"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", action="append", help="path to profile, repeatable (default: menus, orders)")
+    parser.add_argument("--requests", type=int, default=30, help="profiled requests per path")
+    parser.add_argument("--top", type=int, default=15, help="functions to list per path")
+    parser.add_argument("--output-dir", help="write a .prof file per path here")
+    args = parser.parse_args()
+    args.path = args.path or ["/api/menus", "/api/orders?limit=500"]
+    asyncio.run(main(args))
@@ -0,0 +1,231 @@
+"""Throughput, latency and SQL query counts for every API endpoint.
+
+    cd backend
+    python manage.py seed_data --restaurants 10000 --users 100000 --orders 1000000
+    python -m benchmarks.endpoints --concurrency 32 --requests 500 --output after.json
+    python -m benchmarks.endpoints --baseline before.json
+
+Each scenario sends --requests requests from --concurrency concurrent
+clients and reports rps, p50/p95/p99 latency, errors and SQL queries per
+request. Setup work such as creating the orders that the cancel scenario
+cancels is not timed.
+
+With --baseline, results are compared with an earlier JSON report. A scenario
+regresses when its p95 latency or throughput is worse by more than
+--tolerance, or when it runs more queries per request (by more than half a
+query on average, so periodic checks such as the catalog version read do not
+count). The exit status is 1 if anything regressed.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+# Every login scenario request uses one of a handful of fixture accounts
+os.environ.setdefault("LOGIN_MAX_ATTEMPTS", "1000000000")
+
+from benchmarks.common import counted, install_query_counter, login, make_client, summarize  # noqa: E402
+from fastapi_app.db import ASYNC_DB, DB_THREADS, run_in_db  # noqa: E402
+from fastapi_app.main import PASSWORD_VERIFIER  # noqa: E402
+
+from django.db import connection  # noqa: E402
+
+from api.models import Menu, Order, Restaurant, User  # noqa: E402
+
+USERS = {
+    "admin": ("nickfury@admin.com", "admin123"),
+    "manager": ("captainmarvel@manager.com", "manager123"),
+    "member": ("thor@member.com", "member123"),
+}
+SEARCH_TERMS = ["chick", "pizza", "spicy", "burger", "curry rice", "grilled", "garlic naan", "sushi"]
+SAMPLE_SIZE = 1000
+
+
+class Scenario:
+    """A named request pattern; ``request(n)`` builds the n-th request."""
+
+    def __init__(self, name, user, request, setup=None):
+        self.name = name
+        self.user = user
+        self.request = request
+        self.setup = setup
+
+
+def _sample(queryset, field):
+    return [str(value) for value in queryset.values_list(field, flat=True)[:SAMPLE_SIZE]]
+
+
+def build_scenarios(rng):
+    country = User.objects.get(email=USERS["manager"][0]).country
+    restaurant_ids = _sample(Restaurant.objects.order_by("?"), "id")
+    local_menus = list(
+        Menu.objects.filter(restaurant__country=country)
+        .order_by("?")
+        .values_list("id", "restaurant_id")[:SAMPLE_SIZE]
+    )
+    local_menus = [(str(menu_id), str(restaurant_id)) for menu_id, restaurant_id in local_menus]
+    by_restaurant = {}
+    for menu_id, restaurant_id in local_menus:
+        by_restaurant.setdefault(restaurant_id, []).append(menu_id)
+    logins = list(USERS.values())
+    cancellable = []
+
+    def order_body(n):
+        restaurant_id = rng.choice(list(by_restaurant))
+        menus = by_restaurant[restaurant_id]
+        items = [{"menuId": menu_id, "quantity": 1 + rng.randrange(3)} for menu_id in rng.sample(menus, min(3, len(menus)))]
+        return {"restaurantId": restaurant_id, "items": items}
+
+    def cart_body(n):
+        menu_id, restaurant_id = local_menus[n % len(local_menus)]
+        return {"menuId": menu_id, "quantity": 1, "price": 1.0, "restaurantId": restaurant_id}
+
+    async def create_orders(client, total):
+        for n in range(total):
+            response = await client.post("/api/orders", json=order_body(n))
+            response.raise_for_status()
+            cancellable.append(response.json()["id"])
+
+    return [
+        Scenario(
+            "login", None,
+            lambda n: ("POST", "/api/auth/login", {"email": logins[n % len(logins)][0], "password": logins[n % len(logins)][1]}),
+        ),
+        Scenario("restaurants", "manager", lambda n: ("GET", "/api/restaurants", None)),
+        Scenario(
+            "menus", "admin",
+            lambda n: ("GET", f"/api/menus?restaurantId={restaurant_ids[n % len(restaurant_ids)]}", None),
+        ),
+        Scenario(
+            "search", "admin",
+            lambda n: ("GET", f"/api/search?q={SEARCH_TERMS[n % len(SEARCH_TERMS)]}", None),
+        ),
+        Scenario("cart_add", "manager", lambda n: ("POST", "/api/cart", cart_body(n))),
+        Scenario("cart_get", "manager", lambda n: ("GET", "/api/cart", None)),
+        Scenario(
+            "cart_update", "manager",
+            lambda n: ("PATCH", "/api/cart", [
+                {"menuId": local_menus[(n + i) % len(local_menus)][0], "quantityDelta": 1} for i in range(10)
+            ]),
+        ),
+        Scenario("order_create", "manager", lambda n: ("POST", "/api/orders", order_body(n))),
+        Scenario("order_list", "admin", lambda n: ("GET", "/api/orders?limit=50", None)),
+        Scenario(
+            "order_cancel", "manager",
+            lambda n: ("POST", f"/api/orders/{cancellable[n]}/cancel", None),
+            setup=create_orders,
+        ),
+        Scenario("payment_methods", "admin", lambda n: ("GET", "/api/payment-methods", None)),
+    ]
+
+
+async def run_scenario(client, scenario, concurrency, total):
+    latencies = []
+    queries = []
+    errors = 0
+    remaining = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for n in remaining:
+            method, path, body = scenario.request(n)
+            response, latency, count = await counted(lambda: client.request(method, path, json=body))
+            if response.status_code >= 400:
+                errors += 1
+            latencies.append(latency)
+            queries.append(count)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    result = summarize(latencies, time.perf_counter() - start)
+    result["errors"] = errors
+    result["queries_per_request"] = round(sum(queries) / len(queries), 2) if queries else 0.0
+    return result
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if result["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {before['p95_ms']}ms -> {result['p95_ms']}ms")
+        if result["rps"] < before["rps"] * (1 - tolerance):
+            regressions.append(f"{name}: rps {before['rps']} -> {result['rps']}")
+        if result["queries_per_request"] > before["queries_per_request"] + 0.5:
+            regressions.append(
+                f"{name}: queries/request {before['queries_per_request']} -> {result['queries_per_request']}"
+            )
+    return regressions
+
+
+async def main(args):
+    install_query_counter()
+    await asyncio.get_running_loop().run_in_executor(None, PASSWORD_VERIFIER.start)
+    scenarios = await run_in_db(build_scenarios, random.Random(args.seed))
+    if args.only:
+        scenarios = [scenario for scenario in scenarios if scenario.name in args.only]
+
+    clients = {}
+    results = {}
+    for scenario in scenarios:
+        client = clients.get(scenario.user)
+        if client is None:
+            client = clients[scenario.user] = make_client()
+            if scenario.user is not None:
+                await login(client, *USERS[scenario.user])
+        if scenario.setup is not None:
+            await scenario.setup(client, args.requests)
+        result = results[scenario.name] = await run_scenario(client, scenario, args.concurrency, args.requests)
+        print(
+            f"{scenario.name:<16} rps={result['rps']:<9} p50={result['p50_ms']:<8} p95={result['p95_ms']:<8} "
+            f"p99={result['p99_ms']:<8} queries={result['queries_per_request']:<6} errors={result['errors']}"
+        )
+    for client in clients.values():
+        await client.aclose()
+    PASSWORD_VERIFIER.shutdown()
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "database": connection.vendor,
+            "orders": await run_in_db(Order.objects.count),
+            "menus": await run_in_db(Menu.objects.count),
+            "async_db": ASYNC_DB,
+            "db_threads": DB_THREADS,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(report, fh, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--only", type=lambda value: value.split(","), help="comma-separated scenario names")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="earlier JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed relative p95/rps change")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,75 @@
+"""Login throughput with hashed passwords.
+
+    cd backend
+    LOGIN_MAX_ATTEMPTS=1000000 python -m benchmarks.login --concurrency 32 --requests 200
+
+Reports logins per second overall and per hashing worker (AUTH_HASH_WORKERS,
+one per core by default). The run is repeated with the verified-credential
+cache cold and warm, to show both the full hashing cost and the cached path.
+Raise LOGIN_MAX_ATTEMPTS, otherwise the per-email rate limit answers 429.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks.common import make_client, summarize, timed
+from fastapi_app.main import PASSWORD_VERIFIER
+
+USERS = [
+    ("nickfury@admin.com", "admin123"),
+    ("captainmarvel@manager.com", "manager123"),
+    ("captainamerica@manager.com", "manager123"),
+    ("thanos@member.com", "member123"),
+    ("thor@member.com", "member123"),
+    ("travis@member.com", "member123"),
+]
+
+
+async def run(client, concurrency, total):
+    latencies = []
+    remaining = iter(range(total))
+
+    async def worker():
+        for n in remaining:
+            email, password = USERS[n % len(USERS)]
+            response, latency = await timed(
+                lambda: client.post("/api/auth/login", json={"email": email, "password": password})
+            )
+            response.raise_for_status()
+            latencies.append(latency)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    result = summarize(latencies, time.perf_counter() - start)
+    result["rps_per_worker"] = round(result["rps"] / PASSWORD_VERIFIER.workers, 2)
+    return result
+
+
+async def main(args):
+    await asyncio.get_running_loop().run_in_executor(None, PASSWORD_VERIFIER.start)
+    report = {"hash_workers": PASSWORD_VERIFIER.workers, "concurrency": args.concurrency}
+    async with make_client() as client:
+        cache_ttl = PASSWORD_VERIFIER.cache.ttl
+        PASSWORD_VERIFIER.cache.ttl = 0
+        report["uncached"] = await run(client, args.concurrency, args.requests)
+        PASSWORD_VERIFIER.cache.ttl = cache_ttl
+        report["cached"] = await run(client, args.concurrency, args.requests)
+    PASSWORD_VERIFIER.shutdown()
+    for mode in ("uncached", "cached"):
+        result = report[mode]
+        print(
+            f"{mode:<9} logins/s={result['rps']:<8} per worker={result['rps_per_worker']:<8} "
+            f"p50={result['p50_ms']}ms p99={result['p99_ms']}ms"
+        )
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(report, fh, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,193 @@
+"""Throughput of the FastAPI app over real HTTP under each serving profile.
+
+    cd backend
+    python -m benchmarks.serving --duration 20 --connections 64
+    python -m benchmarks.serving --profiles uvicorn,gunicorn --path /api/orders?limit=20
+
+Profiles:
+- uvicorn: the old supervisord command, a single ``uvicorn fastapi_app.main:app``
+  process on asyncio and h11 (what it ran before uvloop/httptools were installed).
+- gunicorn: gunicorn_api.conf.py, WEB_CONCURRENCY uvicorn workers on uvloop and
+  httptools.
+
+Each profile is started as a subprocess on a free local port against the
+database DJANGO_SETTINGS_MODULE/POSTGRES_* point at (seed it first with
+``python manage.py seed_data``). It then gets --duration seconds of load from
+--clients load-generator processes holding --connections keep-alive
+connections between them. The load generators share the machine with the
+server, so compare profiles against each other rather than reading the
+numbers as absolute capacity.
+
+Unlike the other benchmarks this one does not import the app, so it measures
+the servers exactly as they are deployed.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+ADMIN = ("nickfury@admin.com", "admin123")
+PROFILES = {
+    "uvicorn": lambda port: [
+        sys.executable, "-m", "uvicorn", "fastapi_app.main:app",
+        "--host", "127.0.0.1", "--port", str(port), "--loop", "asyncio", "--http", "h11", "--no-access-log",
+    ],
+    "gunicorn": lambda port: [
+        sys.executable, "-m", "gunicorn", "-c", "gunicorn_api.conf.py", "--bind", f"127.0.0.1:{port}",
+        "fastapi_app.main:app",
+    ],
+}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start(profile: str, port: int, metrics_dir: str) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        # More than one worker needs the shared store; use it for every profile alike
+        "SESSION_BACKEND": "database",
+        "PROMETHEUS_MULTIPROC_DIR": metrics_dir,
+        "QUERY_STATS": os.environ.get("QUERY_STATS", "0"),
+    }
+    process = subprocess.Popen(PROFILES[profile](port), env=env, stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{profile} exited with status {process.returncode}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                return process
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    stop(process)
+    raise RuntimeError(f"{profile} did not answer /health within 60s")
+
+
+def stop(process: subprocess.Popen) -> None:
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=40)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+async def _generate(base_url, token, paths, connections, duration):
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+    latencies = []
+    errors = 0
+    async with httpx.AsyncClient(base_url=base_url, cookies={"auth_token": token}, limits=limits) as client:
+        deadline = time.perf_counter() + duration
+
+        async def connection(offset):
+            nonlocal errors
+            n = offset
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    response = await client.get(paths[n % len(paths)])
+                    if response.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+                n += 1
+
+        await asyncio.gather(*(connection(i) for i in range(connections)))
+    return latencies, errors
+
+
+def generate_load(args):
+    return asyncio.run(_generate(*args))
+
+
+def measure(base_url, token, paths, clients, connections, duration):
+    per_client = max(1, connections // clients)
+    jobs = [(base_url, token, paths, per_client, duration)] * clients
+    with multiprocessing.get_context("spawn").Pool(clients) as pool:
+        parts = pool.map(generate_load, jobs)
+    latencies = sorted(latency for part, _ in parts for latency in part)
+    errors = sum(errors for _, errors in parts)
+
+    def pct(p):
+        return round(latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] * 1000, 2) if latencies else 0.0
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / duration, 1),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2) if latencies else 0.0,
+        "p50_ms": pct(50),
+        "p95_ms": pct(95),
+        "p99_ms": pct(99),
+    }
+
+
+def main(args):
+    results = {}
+    for profile in args.profiles:
+        port = _free_port()
+        with tempfile.TemporaryDirectory() as metrics_dir:
+            process = start(profile, port, metrics_dir)
+            try:
+                base_url = f"http://127.0.0.1:{port}"
+                response = httpx.post(f"{base_url}/api/auth/login", json={"email": ADMIN[0], "password": ADMIN[1]})
+                response.raise_for_status()
+                token = response.json()["token"]
+                # Warm up caches, connections and worker processes before measuring
+                measure(base_url, token, args.path, args.clients, args.connections, min(3.0, args.duration))
+                result = results[profile] = measure(
+                    base_url, token, args.path, args.clients, args.connections, args.duration
+                )
+            finally:
+                stop(process)
+        print(
+            f"{profile:<10} rps={result['rps']:<9} p50={result['p50_ms']:<8} p95={result['p95_ms']:<8} "
+            f"p99={result['p99_ms']:<8} errors={result['errors']}"
+        )
+
+    if args.output:
+        report = {
+            "meta": {
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "cpus": os.cpu_count(),
+                "web_concurrency": os.environ.get("WEB_CONCURRENCY", str(os.cpu_count())),
+                "paths": args.path,
+                "clients": args.clients,
+                "connections": args.connections,
+                "duration": args.duration,
+            },
+            "results": results,
+        }
+        with open(args.output, "w") as fh:
+            json.dump(report, fh, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", type=lambda value: value.split(","), default=list(PROFILES))
+    parser.add_argument(
+        "--path", action="append", help="path to request, repeatable (default: restaurants, menus, orders)"
+    )
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load per profile")
+    parser.add_argument("--clients", type=int, default=max(1, (os.cpu_count() or 2) // 2), help="load-generator processes")
+    parser.add_argument("--connections", type=int, default=64, help="concurrent connections in total")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+    args.path = args.path or ["/api/restaurants", "/api/menus", "/api/orders?limit=20"]
+    main(args)
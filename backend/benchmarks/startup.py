@@ -0,0 +1,107 @@
+"""Cold start time of the FastAPI app: process start to the first 200 on /health.
+
+    cd backend
+    python -m benchmarks.startup --runs 10
+    python -m benchmarks.startup --settings django_project.settings,django_project.settings_api --output startup.json
+
+For each settings module, a single ``uvicorn fastapi_app.main:app`` process
+is started --runs times on a free local port, alternating between the
+modules, and /health is polled every few milliseconds until it answers 200.
+That covers the interpreter start, the imports, django.setup() and the
+lifespan startup, which is what a new pod or an autoscaled worker waits
+through before it can take traffic. The database is not queried during
+startup, so it only has to be reachable.
+
+Run it on an idle machine and compare settings modules (or commits) against
+each other; the median is reported along with min and max.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.serving import _free_port, stop
+
+POLL_INTERVAL = 0.005
+TIMEOUT = 60
+
+
+def time_to_first_200(settings_module: str) -> float:
+    port = _free_port()
+    env = {**os.environ, "DJANGO_SETTINGS_MODULE": settings_module}
+    command = [
+        sys.executable, "-m", "uvicorn", "fastapi_app.main:app",
+        "--host", "127.0.0.1", "--port", str(port), "--no-access-log",
+    ]
+    start = time.perf_counter()
+    process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        with httpx.Client(timeout=1) as client:
+            while time.perf_counter() - start < TIMEOUT:
+                if process.poll() is not None:
+                    raise RuntimeError(f"{settings_module}: exited with status {process.returncode}")
+                try:
+                    if client.get(f"http://127.0.0.1:{port}/health").status_code == 200:
+                        return time.perf_counter() - start
+                except httpx.TransportError:
+                    pass
+                time.sleep(POLL_INTERVAL)
+        raise RuntimeError(f"{settings_module}: no 200 on /health within {TIMEOUT}s")
+    finally:
+        stop(process)
+
+
+def main(args):
+    times = {settings_module: [] for settings_module in args.settings}
+    for settings_module in args.settings:
+        # The first start also warms the OS file cache and writes .pyc files
+        time_to_first_200(settings_module)
+    # Interleaved, so drift in machine load affects every settings module alike
+    for _ in range(args.runs):
+        for settings_module in args.settings:
+            times[settings_module].append(time_to_first_200(settings_module))
+
+    results = {}
+    for settings_module in args.settings:
+        runs = times[settings_module]
+        result = results[settings_module] = {
+            "median_ms": round(statistics.median(runs) * 1000, 1),
+            "min_ms": round(min(runs) * 1000, 1),
+            "max_ms": round(max(runs) * 1000, 1),
+            "runs": args.runs,
+        }
+        print(
+            f"{settings_module:<32} median={result['median_ms']:<8} min={result['min_ms']:<8} "
+            f"max={result['max_ms']}"
+        )
+
+    if args.output:
+        report = {
+            "meta": {
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "python": sys.version.split()[0],
+                "cpus": os.cpu_count(),
+                "auth_hash_workers": os.environ.get("AUTH_HASH_WORKERS", str(os.cpu_count())),
+            },
+            "results": results,
+        }
+        with open(args.output, "w") as fh:
+            json.dump(report, fh, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--settings",
+        type=lambda value: value.split(","),
+        default=["django_project.settings", "django_project.settings_api"],
+        help="comma-separated Django settings modules to compare",
+    )
+    parser.add_argument("--runs", type=int, default=5, help="starts per settings module")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    main(parser.parse_args())
@@ -0,0 +1,20 @@
+"""Settings for the FastAPI process (fastapi_app.main).
+
+The API only uses Django for the ORM and password hashing, so it loads just
+the apps its models depend on. The admin, sessions, messages and staticfiles
+apps, the middleware and the templates stay in django_project.settings,
+which the Django server and manage.py (migrations, seed_data) keep using.
+"""
+from django_project.settings import *  # noqa: F401,F403
+
+INSTALLED_APPS = [
+    "django.contrib.contenttypes",
+    "django.contrib.auth",
+    "api",
+]
+
+MIDDLEWARE = []
+TEMPLATES = []
+ROOT_URLCONF = None
+WSGI_APPLICATION = None
+AUTH_PASSWORD_VALIDATORS = []
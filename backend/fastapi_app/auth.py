@@ -0,0 +1,187 @@
+"""Password verification for the login endpoint.
+
+Passwords are checked with Django's hashers, which are deliberately slow, so
+the work is done in a process pool (AUTH_HASH_WORKERS) instead of on the event
+loop or the DB threads. Two things bound the cost per login:
+
+- LoginRateLimiter caps attempts per email in a sliding window, per process.
+  With LOGIN_RATE_BACKEND=database (the default when SESSION_BACKEND is
+  database) DatabaseLoginRateLimiter counts them in the api_loginattempt
+  table instead, so the cap holds across all workers.
+- VerifiedCredentialCache remembers, for a short TTL, an HMAC of the last
+  successfully verified password for each email. A repeat login with the same
+  password and an unchanged stored hash skips the slow hash. Only the HMAC
+  (keyed with SECRET_KEY) is kept in memory; set AUTH_CACHE_TTL=0 to disable.
+"""
+import asyncio
+import hashlib
+import hmac
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from django.conf import settings
+
+
+def _warm_up() -> None:
+    import django.contrib.auth.hashers  # noqa: F401
+
+
+def _check_password(raw_password: str, encoded: Optional[str]) -> bool:
+    from django.contrib.auth.hashers import check_password, make_password
+
+    if encoded is None:
+        # Unknown email: spend the same time as a real check
+        make_password(raw_password)
+        return False
+    return check_password(raw_password, encoded)
+
+
+class LoginRateLimiter:
+    # True when allow() does blocking I/O and must stay off the event loop
+    blocking = False
+
+    def __init__(self, max_attempts: int = 10, window: float = 60.0, max_keys: int = 100_000, clock=time.monotonic):
+        self.max_attempts = max_attempts
+        self.window = window
+        self.max_keys = max_keys
+        self._clock = clock
+        self._lock = threading.Lock()
+        # key -> deque of attempt timestamps, least recently used first
+        self._attempts = OrderedDict()
+
+    def allow(self, key: str) -> bool:
+        now = self._clock()
+        with self._lock:
+            attempts = self._attempts.get(key)
+            if attempts is None:
+                attempts = self._attempts[key] = deque()
+            self._attempts.move_to_end(key)
+            while attempts and attempts[0] <= now - self.window:
+                attempts.popleft()
+            if len(attempts) >= self.max_attempts:
+                return False
+            attempts.append(now)
+            while len(self._attempts) > self.max_keys:
+                self._attempts.popitem(last=False)
+            return True
+
+
+class DatabaseLoginRateLimiter:
+    blocking = True
+
+    def __init__(self, max_attempts: int = 10, window: float = 60.0, clock=time.monotonic):
+        self.max_attempts = max_attempts
+        self.window = window
+        self._clock = clock
+        self._purged_at = clock()
+
+    @staticmethod
+    def _key(email: str) -> str:
+        return hashlib.sha256(email.encode()).hexdigest()
+
+    def allow(self, key: str) -> bool:
+        # Not at module level: the hashing processes import this module without Django set up
+        from api.models import LoginAttempt
+
+        # Rows of finished windows are only reset by the next attempt; clear them once a window
+        if self._clock() - self._purged_at >= self.window:
+            self._purged_at = self._clock()
+            LoginAttempt.objects.purge_expired(self.window)
+        return LoginAttempt.objects.record(self._key(key), self.window) <= self.max_attempts
+
+
+class VerifiedCredentialCache:
+    def __init__(self, max_entries: int = 10_000, ttl: float = 300.0, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        # email -> (expires_at, digest)
+        self._entries = OrderedDict()
+        self._key = hashlib.sha256(b"fastapi_app.auth:" + settings.SECRET_KEY.encode()).digest()
+
+    def _digest(self, raw_password: str, encoded: str) -> bytes:
+        # The stored hash is part of the message, so a password change invalidates the entry
+        return hmac.new(self._key, f"{encoded}\0{raw_password}".encode(), hashlib.sha256).digest()
+
+    def check(self, email: str, raw_password: str, encoded: str) -> bool:
+        if self.ttl <= 0:
+            return False
+        with self._lock:
+            entry = self._entries.get(email)
+        if entry is None or entry[0] <= self._clock():
+            return False
+        return hmac.compare_digest(entry[1], self._digest(raw_password, encoded))
+
+    def remember(self, email: str, raw_password: str, encoded: str) -> None:
+        if self.ttl <= 0:
+            return
+        digest = self._digest(raw_password, encoded)
+        with self._lock:
+            self._entries[email] = (self._clock() + self.ttl, digest)
+            self._entries.move_to_end(email)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class PasswordVerifier:
+    def __init__(self, workers: int, cache: VerifiedCredentialCache):
+        self.workers = workers
+        self.cache = cache
+        self._pool = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        # Created lazily so importing the app does not start processes. Workers
+        # are spawned rather than forked: the parent already runs threads.
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    def start(self, wait: bool = True) -> None:
+        # Pay the worker start-up cost before the first login. With wait=False
+        # the workers boot in the background; a login arriving meanwhile
+        # queues behind the warm-up instead of starting more processes.
+        futures = [self._get_pool().submit(_warm_up) for _ in range(self.workers)]
+        if wait:
+            for future in futures:
+                future.result()
+
+    async def verify(self, email: str, raw_password: str, encoded: Optional[str]) -> bool:
+        if encoded is not None and self.cache.check(email, raw_password, encoded):
+            return True
+        loop = asyncio.get_running_loop()
+        ok = await loop.run_in_executor(self._get_pool(), _check_password, raw_password, encoded)
+        if ok:
+            self.cache.remember(email, raw_password, encoded)
+        return ok
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+def get_password_verifier() -> PasswordVerifier:
+    cache = VerifiedCredentialCache(
+        max_entries=int(os.environ.get("AUTH_CACHE_MAX_ENTRIES", "10000")),
+        ttl=float(os.environ.get("AUTH_CACHE_TTL", "300")),
+    )
+    return PasswordVerifier(int(os.environ.get("AUTH_HASH_WORKERS", str(os.cpu_count() or 1))), cache)
+
+
+def get_login_rate_limiter():
+    max_attempts = int(os.environ.get("LOGIN_MAX_ATTEMPTS", "10"))
+    window = float(os.environ.get("LOGIN_RATE_WINDOW", "60"))
+    backend = os.environ.get("LOGIN_RATE_BACKEND", os.environ.get("SESSION_BACKEND", "memory"))
+    if backend == "memory":
+        return LoginRateLimiter(max_attempts=max_attempts, window=window)
+    if backend == "database":
+        return DatabaseLoginRateLimiter(max_attempts=max_attempts, window=window)
+    raise ValueError(f"Unknown LOGIN_RATE_BACKEND: {backend}")
@@ -0,0 +1,99 @@
+"""Read-through cache for the restaurant and menu catalog.
+
+Entries hold the already-serialized JSON body of a catalog response, keyed by
+endpoint and scope (country, restaurantId), in a per-process LRU with TTL.
+
+Coherence across workers comes from the CatalogVersion row, which the signal
+handlers in api/signals.py bump on every Restaurant/Menu save or delete. Each
+entry remembers the version it was built from; the current version is re-read
+from the database at most once per CATALOG_VERSION_CHECK_INTERVAL, and the
+writing process picks up its own changes immediately via ``catalog_changed``.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from api.models import CatalogVersion
+from api.signals import catalog_changed
+
+
+class CatalogCache:
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: float = 300.0,
+        version_check_interval: float = 1.0,
+        clock=time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.version_check_interval = version_check_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        # key -> (version, expires_at, body)
+        self._entries = OrderedDict()
+        self._version = None
+        self._version_checked_at = None
+        self.hits = 0
+        self.misses = 0
+        self.hit_seconds = 0.0
+
+    def version(self) -> int:
+        now = self._clock()
+        checked_at = self._version_checked_at
+        if checked_at is None or now - checked_at >= self.version_check_interval:
+            version = CatalogVersion.objects.filter(id=1).values_list("version", flat=True).first() or 0
+            with self._lock:
+                self._version = version
+                self._version_checked_at = now
+        return self._version
+
+    def get(self, key, version: int) -> Optional[bytes]:
+        """Return the body stored for ``key`` if it was built from catalog ``version``."""
+        start = time.perf_counter()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version or entry[1] <= self._clock():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.hit_seconds += time.perf_counter() - start
+            return entry[2]
+
+    def set(self, key, body: bytes, version: int) -> None:
+        """Store ``body``, built from catalog ``version`` (read before querying)."""
+        with self._lock:
+            self._entries[key] = (version, self._clock() + self.ttl, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, **kwargs) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._version_checked_at = None
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "mean_hit_us": self.hit_seconds / self.hits * 1e6 if self.hits else 0.0,
+        }
+
+
+def get_catalog_cache() -> CatalogCache:
+    cache = CatalogCache(
+        max_entries=int(os.environ.get("CATALOG_CACHE_MAX_ENTRIES", "1024")),
+        ttl=float(os.environ.get("CATALOG_CACHE_TTL", "300")),
+        version_check_interval=float(os.environ.get("CATALOG_VERSION_CHECK_INTERVAL", "1")),
+    )
+    catalog_changed.connect(cache.invalidate, weak=False)
+    return cache
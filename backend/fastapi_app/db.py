@@ -0,0 +1,159 @@
+"""Run Django ORM work from async request handlers.
+
+Handlers are ``async def`` and hand their ORM block to a dedicated, bounded
+thread pool, so the event loop can hold thousands of in-flight requests while
+database concurrency stays capped at DB_THREADS.
+
+Django's own async ORM (``aget``, ``acreate``, ``async for``) is not used on
+purpose: outside Django's ASGI handler every one of those calls goes through
+``sync_to_async(thread_sensitive=True)``, which funnels all queries of the
+process through a single thread.
+
+Set ASYNC_DB=0 to fall back to plain sync handlers on FastAPI's default
+threadpool (useful for benchmarking the two modes against each other).
+
+The executor doubles as the connection pool: each DB thread keeps one
+connection open for CONN_MAX_AGE seconds (DB_CONN_MAX_AGE), so a worker holds
+at most DB_THREADS connections. Every call first makes its thread's
+connection ready, replacing it when it is too old, broken or, with
+CONN_HEALTH_CHECKS, no longer answers. The call is then cleaned up the way
+Django's request_started/request_finished signals would after a view.
+"""
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import close_old_connections, connection
+from django.db.backends.signals import connection_created
+
+ASYNC_DB = os.environ.get("ASYNC_DB", "1") == "1"
+DB_THREADS = int(os.environ.get("DB_THREADS", "16"))
+
+_executor = ThreadPoolExecutor(max_workers=DB_THREADS, thread_name_prefix="db")
+
+
+class ExecutorUsage:
+    """Load on the DB executor and the connections it holds, for /metrics and /health/ready."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.running = 0
+        self.calls = 0
+        self.wait_seconds = 0.0
+        self.acquire_seconds = 0.0
+        self.connections_opened = 0
+        self._connections = weakref.WeakSet()
+
+    def submitted(self, future) -> None:
+        with self._lock:
+            self.in_flight += 1
+        # Also fires for calls cancelled before they started
+        future.add_done_callback(self._finished)
+
+    def _finished(self, future) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    def started(self, waited: float) -> None:
+        with self._lock:
+            self.running += 1
+            self.calls += 1
+            self.wait_seconds += waited
+
+    def stopped(self) -> None:
+        with self._lock:
+            self.running -= 1
+
+    def acquired(self, seconds: float) -> None:
+        with self._lock:
+            self.acquire_seconds += seconds
+
+    def connection_created(self, sender, connection, **kwargs) -> None:
+        with self._lock:
+            self.connections_opened += 1
+            self._connections.add(connection)
+
+    def stats(self) -> dict:
+        with self._lock:
+            wrappers = list(self._connections)
+            stats = {
+                "threads": DB_THREADS,
+                "in_flight": self.in_flight,
+                "running": self.running,
+                "calls": self.calls,
+                "wait_seconds": self.wait_seconds,
+                "acquire_seconds": self.acquire_seconds,
+                "connections_opened": self.connections_opened,
+            }
+        # Every thread that ran a query owns one wrapper; count those still connected
+        stats["connections_open"] = sum(1 for wrapper in wrappers if wrapper.connection is not None)
+        return stats
+
+
+USAGE = ExecutorUsage()
+connection_created.connect(USAGE.connection_created, weak=False)
+
+
+def _acquire() -> None:
+    """Make this thread's connection ready, replacing it if it is too old or broken.
+
+    What Django's request_started does for a view: honours CONN_MAX_AGE and,
+    with CONN_HEALTH_CHECKS, checks a reused connection before handing it out.
+    """
+    start = time.perf_counter()
+    close_old_connections()
+    connection.close_if_health_check_failed()
+    connection.ensure_connection()
+    USAGE.acquired(time.perf_counter() - start)
+
+
+def _managed(func, *args, **kwargs):
+    _acquire()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        # What request_finished does: drop the connection if it broke or expired
+        close_old_connections()
+
+
+def _submit(func, *args, **kwargs):
+    # Carry contextvars over so per-request state is visible in the worker thread
+    ctx = contextvars.copy_context()
+    submitted_at = time.perf_counter()
+
+    def call():
+        USAGE.started(time.perf_counter() - submitted_at)
+        try:
+            return ctx.run(_managed, func, *args, **kwargs)
+        finally:
+            USAGE.stopped()
+
+    future = _executor.submit(call)
+    USAGE.submitted(future)
+    return asyncio.wrap_future(future)
+
+
+async def run_in_db(func, *args, **kwargs):
+    return await _submit(func, *args, **kwargs)
+
+
+def db_endpoint(func):
+    """Turn a sync ORM handler into an async one that runs on the DB executor."""
+    if not ASYNC_DB:
+        @functools.wraps(func)
+        def sync_wrapper(*args, **kwargs):
+            return _managed(func, *args, **kwargs)
+
+        return sync_wrapper
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await run_in_db(func, *args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,172 @@
+"""Readiness checks for GET /health/ready.
+
+/health stays a liveness probe that never touches the database. /health/ready
+reports whether this worker can serve traffic right now:
+
+- database: a ``SELECT 1`` round trip made through the DB executor, so its
+  latency includes the time spent waiting for a free DB thread. The probe
+  runs at most once per HEALTH_CHECK_INTERVAL whatever the number of callers;
+  the result is cached in between and concurrent callers share one probe.
+- sessions: a lookup in the session store when it is shared (database
+  backend), otherwise how full the in-memory store is.
+- executor: calls waiting for a DB thread, read live on every request.
+
+Each check is "ok", "degraded" or "fail" against the HEALTH_* thresholds and
+the overall status is the worst of them. Only "fail" turns the response into
+a 503: taking every degraded worker out of rotation at once would move the
+load onto fewer workers and make things worse.
+"""
+import asyncio
+import os
+import time
+
+from django.db import connection
+
+from fastapi_app.db import ExecutorUsage, run_in_db
+from fastapi_app.sessions import MemorySessionStore, SessionStore
+
+OK, DEGRADED, FAIL = "ok", "degraded", "fail"
+SEVERITY = {OK: 0, DEGRADED: 1, FAIL: 2}
+# Looked up in a shared session store; never issued, so it never matches
+PROBE_TOKEN = "health-check"
+
+
+def worst(*statuses: str) -> str:
+    return max(statuses, key=SEVERITY.__getitem__)
+
+
+def _grade(value: float, degraded: float, failed: float) -> str:
+    if value >= failed:
+        return FAIL
+    if value >= degraded:
+        return DEGRADED
+    return OK
+
+
+class ReadinessProbe:
+    def __init__(
+        self,
+        sessions: SessionStore,
+        usage: ExecutorUsage,
+        interval: float = 1.0,
+        timeout: float = 2.0,
+        latency_degraded: float = 0.1,
+        latency_failed: float = 1.0,
+        queue_degraded: float = 1.0,
+        queue_failed: float = 4.0,
+        clock=time.monotonic,
+    ):
+        self.sessions = sessions
+        self.usage = usage
+        self.interval = interval
+        self.timeout = timeout
+        self.latency_degraded = latency_degraded
+        self.latency_failed = latency_failed
+        # Multiples of the number of DB threads
+        self.queue_degraded = queue_degraded
+        self.queue_failed = queue_failed
+        self._clock = clock
+        self._probe = None
+        self._result = None
+        self._checked_at = None
+
+    def _round_trip(self, submitted_at: float) -> dict:
+        started = time.perf_counter()
+        result = {"wait_ms": round((started - submitted_at) * 1000, 2)}
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+            result["query_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            if self.sessions.blocking:
+                session_started = time.perf_counter()
+                self.sessions.get(PROBE_TOKEN)
+                result["session_ms"] = round((time.perf_counter() - session_started) * 1000, 2)
+        except Exception as exc:
+            result["error"] = f"{type(exc).__name__}: {exc}".strip()
+            connection.close_if_unusable_or_obsolete()
+        return result
+
+    async def _measure(self) -> dict:
+        submitted_at = time.perf_counter()
+        try:
+            result = await run_in_db(self._round_trip, submitted_at)
+        except Exception as exc:
+            # Raised while (re)connecting, before the round trip started
+            return {"error": f"{type(exc).__name__}: {exc}".strip()}
+        result["latency_ms"] = round((time.perf_counter() - submitted_at) * 1000, 2)
+        return result
+
+    async def _database(self) -> dict:
+        now = self._clock()
+        if self._result is not None and now - self._checked_at < self.interval:
+            return self._result
+        if self._probe is None or self._probe.done():
+            self._probe = asyncio.ensure_future(self._measure())
+        try:
+            result = await asyncio.wait_for(asyncio.shield(self._probe), self.timeout)
+        except asyncio.TimeoutError:
+            # The probe keeps running; later checks wait on it rather than queueing another
+            result = {"error": f"no response within {self.timeout}s"}
+        self._result = result
+        self._checked_at = self._clock()
+        return result
+
+    async def check(self) -> dict:
+        probe = await self._database()
+        if "error" in probe:
+            database = {"status": FAIL, "error": probe["error"]}
+        else:
+            database = {
+                "status": _grade(probe["latency_ms"] / 1000, self.latency_degraded, self.latency_failed),
+                "latency_ms": probe["latency_ms"],
+                "wait_ms": probe["wait_ms"],
+                "query_ms": probe["query_ms"],
+            }
+        database["age_s"] = round(self._clock() - self._checked_at, 2)
+
+        if isinstance(self.sessions, MemorySessionStore):
+            size = len(self.sessions)
+            # A full store evicts the least recently used sessions, logging their users out
+            sessions = {
+                "status": DEGRADED if size >= self.sessions.max_size else OK,
+                "backend": "memory",
+                "size": size,
+                "max_size": self.sessions.max_size,
+            }
+        elif "error" in probe:
+            sessions = {"status": FAIL, "backend": "database"}
+        else:
+            sessions = {
+                "status": _grade(probe["session_ms"] / 1000, self.latency_degraded, self.latency_failed),
+                "backend": "database",
+                "latency_ms": probe["session_ms"],
+            }
+
+        usage = self.usage.stats()
+        queued = max(0, usage["in_flight"] - usage["running"])
+        executor = {
+            "status": _grade(queued / usage["threads"], self.queue_degraded, self.queue_failed),
+            "threads": usage["threads"],
+            "running": usage["running"],
+            "queued": queued,
+            "connections_open": usage["connections_open"],
+        }
+
+        return {
+            "status": worst(database["status"], sessions["status"], executor["status"]),
+            "checks": {"database": database, "sessions": sessions, "executor": executor},
+        }
+
+
+def get_readiness_probe(sessions: SessionStore, usage: ExecutorUsage) -> ReadinessProbe:
+    return ReadinessProbe(
+        sessions,
+        usage,
+        interval=float(os.environ.get("HEALTH_CHECK_INTERVAL", "1")),
+        timeout=float(os.environ.get("HEALTH_DB_TIMEOUT", "2")),
+        latency_degraded=float(os.environ.get("HEALTH_DB_DEGRADED_MS", "100")) / 1000,
+        latency_failed=float(os.environ.get("HEALTH_DB_FAILED_MS", "1000")) / 1000,
+        queue_degraded=float(os.environ.get("HEALTH_QUEUE_DEGRADED", "1")),
+        queue_failed=float(os.environ.get("HEALTH_QUEUE_FAILED", "4")),
+    )
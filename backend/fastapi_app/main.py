@@ -1,25 +1,96 @@
-from fastapi import FastAPI, Depends, HTTPException, status, Cookie
+from fastapi import FastAPI, Depends, HTTPException, status, Cookie, Header, Query, Response
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, UUID4
+from pydantic import BaseModel, Field, UUID4
 from typing import Optional, List
+from uuid import UUID
+from contextlib import asynccontextmanager
+from datetime import datetime
+import base64
+import hashlib
 import os
 import sys
-from datetime import datetime, timedelta
 import secrets
 from decimal import Decimal
 
 # Add Django project to path
 sys.path.append('/app')
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'django_project.settings')
+# Lean settings: only the apps the API uses (see django_project/settings_api.py)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'django_project.settings_api')
 
 # Setup Django
 import django
 django.setup()
 
-# Import Django models
-from api.models import User, Restaurant, Menu, Order, OrderItem, PaymentMethod, CartItem
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q
 
-app = FastAPI(title="Slooze API", version="0.1.0")
+# Import Django models
+from api.models import User, Restaurant, Menu, Order, OrderItem, OrderSummary, PaymentMethod, CartItem
+from api.order_summaries import build_summary, summary_item
+from fastapi_app.auth import get_login_rate_limiter, get_password_verifier
+from fastapi_app.catalog_cache import get_catalog_cache
+from fastapi_app.health import FAIL, get_readiness_probe
+from fastapi_app.db import USAGE as DB_USAGE, db_endpoint, run_in_db
+from fastapi_app import metrics, order_events, query_stats
+from fastapi_app.search import get_search_backend
+from fastapi_app.serialization import JSONResponse, dumps, row_encoder
+from fastapi_app.sessions import get_session_store
+from fastapi_app.tokens import get_token_signer
+
+# Session store shared by all endpoints (see fastapi_app/sessions.py)
+SESSIONS = get_session_store()
+SESSION_TTL_SECONDS = int(os.environ.get("SESSION_TTL_SECONDS", str(24 * 60 * 60)))
+SESSION_SWEEP_INTERVAL = float(os.environ.get("SESSION_SWEEP_INTERVAL", "60"))
+
+# SESSION_TOKENS=signed: stateless HMAC-signed tokens, SESSIONS only holds revocations
+TOKEN_SIGNER = get_token_signer(SESSIONS, SESSION_TTL_SECONDS)
+
+# Login: hashed password checks in a process pool, per-email rate limiting
+PASSWORD_VERIFIER = get_password_verifier()
+LOGIN_RATE_LIMITER = get_login_rate_limiter()
+
+# Pre-serialized restaurant/menu responses (see fastapi_app/catalog_cache.py)
+CATALOG_CACHE = get_catalog_cache()
+SEARCH = get_search_backend(CATALOG_CACHE.version)
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 100
+# Deep offsets cost as much as reading every result before them
+SEARCH_MAX_OFFSET = 1000
+
+ORDERS_PAGE_SIZE = int(os.environ.get("ORDERS_PAGE_SIZE", "100"))
+ORDERS_MAX_PAGE_SIZE = int(os.environ.get("ORDERS_MAX_PAGE_SIZE", "500"))
+ORDERS_STREAM_CHUNK_SIZE = 500
+# Bounds the single upsert statement behind PATCH /api/cart
+CART_MAX_OPERATIONS = int(os.environ.get("CART_MAX_OPERATIONS", "500"))
+ORDER_STATUS_MAX_BATCH = int(os.environ.get("ORDER_STATUS_MAX_BATCH", "500"))
+
+# Live order updates for GET /api/orders/events (see fastapi_app/order_events.py)
+ORDER_EVENTS = order_events.get_order_events()
+
+# Prometheus metrics for /metrics (see fastapi_app/metrics.py)
+METRICS_SAMPLER = metrics.MetricsSampler(SESSIONS, CATALOG_CACHE, DB_USAGE)
+METRICS_SAMPLE_INTERVAL = float(os.environ.get("METRICS_SAMPLE_INTERVAL", "5"))
+
+# Cached DB round trip, session store and executor checks for /health/ready
+READINESS = get_readiness_probe(SESSIONS, DB_USAGE)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    SESSIONS.start_sweeper(SESSION_SWEEP_INTERVAL)
+    METRICS_SAMPLER.start(METRICS_SAMPLE_INTERVAL)
+    # Hashing processes boot in the background so startup does not wait on them
+    PASSWORD_VERIFIER.start(wait=False)
+    ORDER_EVENTS.start()
+    yield
+    ORDER_EVENTS.stop()
+    SESSIONS.stop_sweeper()
+    METRICS_SAMPLER.stop()
+    PASSWORD_VERIFIER.shutdown()
+
+# orjson rendering for every response (see fastapi_app/serialization.py)
+app = FastAPI(title="Slooze API", version="0.1.0", lifespan=lifespan, default_response_class=JSONResponse)
 
 # CORS middleware for frontend
 app.add_middleware(
@@ -28,10 +99,19 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
-# In-memory session store (use Redis in production)
-SESSIONS = {}
+# Query count, DB time and slowest statements per request (see fastapi_app/query_stats.py)
+if query_stats.QUERY_STATS:
+    query_stats.install()
+    app.add_middleware(
+        query_stats.QueryStatsMiddleware,
+        max_queries=query_stats.QUERY_STATS_MAX_QUERIES,
+        keep_slowest=query_stats.QUERY_STATS_SLOWEST,
+    )
+
+app.add_middleware(metrics.MetricsMiddleware)
 
 # Models
 class Health(BaseModel):
@@ -59,10 +139,17 @@ class MenuResponse(BaseModel):
     price: float
     description: str
 
+class OrderItemRequest(BaseModel):
+    menuId: UUID
+    quantity: int = Field(gt=0)
+    # Ignored: prices are taken from the menu
+    price: Optional[float] = None
+
 class CreateOrderRequest(BaseModel):
     restaurantId: str
-    items: List[dict]
-    totalAmount: float
+    items: List[OrderItemRequest]
+    # Ignored: the total is computed from menu prices
+    totalAmount: Optional[float] = None
 
 class OrderResponse(BaseModel):
     id: str
@@ -70,8 +157,27 @@ class OrderResponse(BaseModel):
     restaurantId: str
     totalAmount: float
     status: str
+    version: int
     createdAt: str
 
+class CancelOrderRequest(BaseModel):
+    # Cancel only if the order is still at this version (409 otherwise)
+    version: Optional[int] = None
+
+class OrderStatusRequest(BaseModel):
+    orderIds: List[UUID]
+    status: str
+
+class OrderStatusFailure(BaseModel):
+    id: str
+    error: str
+    # Current status, when the order exists and is visible to the caller
+    status: Optional[str] = None
+
+class OrderStatusResponse(BaseModel):
+    updated: List[OrderResponse]
+    failed: List[OrderStatusFailure]
+
 class PaymentMethodResponse(BaseModel):
     id: str
     userId: str
@@ -89,6 +195,15 @@ class AddToCartRequest(BaseModel):
     price: float
     restaurantId: str
 
+class CartOperation(BaseModel):
+    menuId: UUID
+    # Negative deltas remove quantity; rows that drop to zero are deleted
+    quantityDelta: int
+
+class CheckoutRequest(BaseModel):
+    # Required only when the cart holds items from several restaurants
+    restaurantId: Optional[str] = None
+
 class CartItemResponse(BaseModel):
     id: str
     menuId: str
@@ -98,14 +213,30 @@ class CartItemResponse(BaseModel):
     restaurantId: str
 
 # Auth helpers
-def get_current_user(auth_token: Optional[str] = Cookie(None)):
-    if not auth_token or auth_token not in SESSIONS:
+async def get_current_user(auth_token: Optional[str] = Cookie(None)):
+    if not auth_token:
         raise HTTPException(status_code=401, detail="Unauthorized")
     
-    session = SESSIONS[auth_token]
-    if session["expires_at"] < datetime.now():
-        del SESSIONS[auth_token]
-        raise HTTPException(status_code=401, detail="Session expired")
+    if TOKEN_SIGNER is not None:
+        claims = TOKEN_SIGNER.verify(auth_token)
+        if claims is None:
+            raise HTTPException(status_code=401, detail="Unauthorized")
+        revocations = TOKEN_SIGNER.revocations
+        if revocations.needs_check(claims["jti"]):
+            if SESSIONS.blocking:
+                revoked = await run_in_db(revocations.check, claims["jti"])
+            else:
+                revoked = revocations.check(claims["jti"])
+            if revoked:
+                raise HTTPException(status_code=401, detail="Unauthorized")
+        return claims["user"]
+    
+    if SESSIONS.blocking:
+        session = await run_in_db(SESSIONS.get, auth_token)
+    else:
+        session = SESSIONS.get(auth_token)
+    if session is None:
+        raise HTTPException(status_code=401, detail="Unauthorized")
     
     return session["user"]
 
@@ -115,15 +246,54 @@ def check_role(user: dict, allowed_roles: List[str]):
 
 # Endpoints
 @app.get("/health", response_model=Health)
-def health():
+async def health():
     db = os.environ.get("POSTGRES_DB", "foodorder_db")
     return {"status": "ok", "database": db}
 
+@app.get("/health/ready")
+async def health_ready(response: Response):
+    report = await READINESS.check()
+    if report["status"] == FAIL:
+        response.status_code = 503
+    return report
+
+def _metrics_body() -> bytes:
+    METRICS_SAMPLER.sample()
+    return metrics.render()
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    # Sampling may count database sessions; rendering reads the multiprocess files
+    return Response(await run_in_db(_metrics_body), media_type=metrics.CONTENT_TYPE_LATEST)
+
+def _find_login_user(email: str):
+    return User.objects.filter(email=email).only(
+        "id", "email", "name", "role", "country", "password"
+    ).first()
+
+def _start_session(user_data: dict) -> str:
+    if TOKEN_SIGNER is not None:
+        return TOKEN_SIGNER.issue(user_data)
+    token = secrets.token_hex(32)
+    SESSIONS.set(token, {"user": user_data}, SESSION_TTL_SECONDS)
+    return token
+
 @app.post("/api/auth/login", response_model=LoginResponse)
-def login(credentials: LoginRequest):
-    try:
-        user = User.objects.get(email=credentials.email, password=credentials.password)
-    except User.DoesNotExist:
+async def login(credentials: LoginRequest):
+    email = credentials.email.strip().lower()
+    if LOGIN_RATE_LIMITER.blocking:
+        allowed = await run_in_db(LOGIN_RATE_LIMITER.allow, email)
+    else:
+        allowed = LOGIN_RATE_LIMITER.allow(email)
+    if not allowed:
+        raise HTTPException(status_code=429, detail="Too many login attempts, try again later")
+    
+    user = await run_in_db(_find_login_user, credentials.email)
+    # Hashing runs in a process pool; unknown emails still pay for one hash
+    verified = await PASSWORD_VERIFIER.verify(
+        credentials.email, credentials.password, user.password if user else None
+    )
+    if not verified:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     user_data = {
@@ -134,193 +304,408 @@ def login(credentials: LoginRequest):
         "country": user.country
     }
     
-    token = secrets.token_hex(32)
-    SESSIONS[token] = {
-        "user": user_data,
-        "expires_at": datetime.now() + timedelta(hours=24)
-    }
+    if SESSIONS.blocking and TOKEN_SIGNER is None:
+        token = await run_in_db(_start_session, user_data)
+    else:
+        token = _start_session(user_data)
     
     return {"user": user_data, "token": token}
 
 @app.post("/api/auth/logout")
+@db_endpoint
 def logout(auth_token: Optional[str] = Cookie(None)):
-    if auth_token and auth_token in SESSIONS:
-        del SESSIONS[auth_token]
+    if auth_token and TOKEN_SIGNER is not None:
+        TOKEN_SIGNER.revoke(auth_token)
+    elif auth_token:
+        SESSIONS.delete(auth_token)
     return {"success": True}
 
+CATALOG_CACHE_CONTROL = "private, no-cache"
+
+def _catalog_etag(key: tuple, version: int) -> str:
+    digest = hashlib.sha1(repr(key).encode()).hexdigest()[:16]
+    return f'"c{version}-{digest}"'
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+
+def _catalog_response(key: tuple, build, if_none_match: Optional[str] = None):
+    # The ETag only depends on the catalog version and the request scope, so a
+    # revalidation is answered before any row is read or serialized
+    version = CATALOG_CACHE.version()
+    etag = _catalog_etag(key, version)
+    headers = {"ETag": etag, "Cache-Control": CATALOG_CACHE_CONTROL, "Vary": "Cookie"}
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    
+    # Serve pre-serialized catalog bodies; build() only runs on a cache miss.
+    # One version read serves the ETag, the lookup and the stored entry
+    body = CATALOG_CACHE.get(key, version)
+    headers["X-Cache"] = "HIT"
+    if body is None:
+        body = dumps(build())
+        CATALOG_CACHE.set(key, body, version)
+        headers["X-Cache"] = "MISS"
+    return Response(content=body, media_type="application/json", headers=headers)
+
+RESTAURANT_COLUMNS = ("id", "name", "country", "description")
+_restaurant_row = row_encoder("id", "name", "country", "description")
+
 @app.get("/api/restaurants", response_model=List[RestaurantResponse])
-def get_restaurants(country: Optional[str] = None, user: dict = Depends(get_current_user)):
-    if user["role"] == "admin":
-        # Admin can filter by country or view all
-        if country:
-            restaurants = Restaurant.objects.filter(country=country)
-        else:
-            restaurants = Restaurant.objects.all()
-    else:
-        # Managers and members can only see their country
-        restaurants = Restaurant.objects.filter(country=user["country"])
-    
-    return [
-        {
-            "id": str(r.id),
-            "name": r.name,
-            "country": r.country,
-            "description": r.description
-        }
-        for r in restaurants
-    ]
+@db_endpoint
+def get_restaurants(
+    country: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    user: dict = Depends(get_current_user)
+):
+    # Admin can filter by country or view all; managers and members only see their country
+    scope = (country or None) if user["role"] == "admin" else user["country"]
+    
+    def build():
+        restaurants = Restaurant.objects.filter(country=scope) if scope else Restaurant.objects.all()
+        return list(map(_restaurant_row, restaurants.values_list(*RESTAURANT_COLUMNS)))
+    
+    return _catalog_response(("restaurants", scope), build, if_none_match)
+
+MENU_COLUMNS = ("id", "restaurant_id", "name", "price", "description")
+_menu_row = row_encoder("id", "restaurantId", "name", "price", "description")
 
 @app.get("/api/menus", response_model=List[MenuResponse])
-def get_menus(restaurantId: Optional[str] = None, user: dict = Depends(get_current_user)):
-    if user["role"] == "admin":
+@db_endpoint
+def get_menus(
+    restaurantId: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    user: dict = Depends(get_current_user)
+):
+    scope = None if user["role"] == "admin" else user["country"]
+    
+    def build():
+        menus = Menu.objects.all()
         if restaurantId:
-            menus = Menu.objects.filter(restaurant_id=restaurantId).select_related('restaurant')
-        else:
-            menus = Menu.objects.all().select_related('restaurant')
-    else:
-        if restaurantId:
-            menus = Menu.objects.filter(
-                restaurant_id=restaurantId,
-                restaurant__country=user["country"]
-            ).select_related('restaurant')
-        else:
-            menus = Menu.objects.filter(
-                restaurant__country=user["country"]
-            ).select_related('restaurant')
-    
-    return [
-        {
-            "id": str(m.id),
-            "restaurantId": str(m.restaurant.id),
-            "name": m.name,
-            "price": float(m.price),
-            "description": m.description
-        }
-        for m in menus
-    ]
+            menus = menus.filter(restaurant_id=restaurantId)
+        if scope:
+            menus = menus.filter(restaurant__country=scope)
+        return list(map(_menu_row, menus.values_list(*MENU_COLUMNS)))
+    
+    return _catalog_response(("menus", scope, restaurantId or None), build, if_none_match)
+
+class SearchResultResponse(BaseModel):
+    id: str
+    restaurantId: str
+    restaurantName: str
+    name: str
+    price: float
+    description: str
+    rank: float
+
+@app.get("/api/search", response_model=List[SearchResultResponse])
+@db_endpoint
+def search(
+    q: str = Query(min_length=1, max_length=200),
+    limit: int = Query(SEARCH_PAGE_SIZE, ge=1, le=SEARCH_MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0, le=SEARCH_MAX_OFFSET),
+    user: dict = Depends(get_current_user)
+):
+    # Same scoping as get_menus: admins search everything, others their country
+    scope = None if user["role"] == "admin" else user["country"]
+    results = SEARCH.search(q, scope, limit + 1, offset)
+    headers = {}
+    if len(results) > limit:
+        results = results[:limit]
+        headers["X-Next-Offset"] = str(offset + limit)
+    return JSONResponse(results, headers=headers)
+
+ORDER_SUMMARY_COLUMNS = (
+    "order_id", "user_id", "restaurant_id", "total_amount", "status", "version", "created_at", "items"
+)
+
+def _orders_queryset(user: dict):
+    # Single-table scan of the OrderSummary read model, newest first
+    orders = OrderSummary.objects.all()
+    if user["role"] != "admin":
+        orders = orders.filter(restaurant_country=user["country"])
+    return orders.order_by('-created_at', '-order_id').values_list(*ORDER_SUMMARY_COLUMNS)
+
+def _encode_cursor(row) -> str:
+    raw = f"{row[6].isoformat()}|{row[0]}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def _decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, order_id = raw.split("|")
+        return datetime.fromisoformat(created_at), UUID(order_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _after_cursor(orders, position):
+    # Keyset on (created_at, order_id) descending: everything strictly after the cursor row
+    created_at, order_id = position
+    return orders.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, order_id__lt=order_id))
+
+# Keys for ORDER_SUMMARY_COLUMNS
+_order_row = row_encoder("id", "userId", "restaurantId", "totalAmount", "status", "version", "createdAt", "items")
+
+async def _stream_orders(orders, limit: Optional[int]):
+    # One keyset query per chunk, each a separate DB call: a slow reader holds
+    # no DB thread (and no connection) between chunks
+    position = None
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = ORDERS_STREAM_CHUNK_SIZE if remaining is None else min(ORDERS_STREAM_CHUNK_SIZE, remaining)
+        chunk = orders if position is None else _after_cursor(orders, position)
+        rows = await run_in_db(list, chunk[:size])
+        if rows:
+            yield b"".join([dumps(_order_row(row)) + b"\n" for row in rows])
+        if len(rows) < size:
+            return
+        if remaining is not None:
+            remaining -= len(rows)
+        position = rows[-1][6], rows[-1][0]
 
 @app.get("/api/orders")
-def get_orders(user: dict = Depends(get_current_user)):
+@db_endpoint
+def get_orders(
+    limit: Optional[int] = Query(None, ge=1, le=ORDERS_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    stream: bool = False,
+    user: dict = Depends(get_current_user)
+):
     if user["role"] == "member":
         raise HTTPException(status_code=403, detail="Members cannot view orders")
     
-    if user["role"] == "admin":
-        orders = Order.objects.all().select_related('user', 'restaurant').prefetch_related('items__menu').order_by('-created_at')
-    else:
-        orders = Order.objects.filter(
-            restaurant__country=user["country"]
-        ).select_related('user', 'restaurant').prefetch_related('items__menu').order_by('-created_at')
-    
-    orders_list = []
-    for order in orders:
-        order_dict = {
-            "id": str(order.id),
-            "userId": str(order.user.id),
-            "restaurantId": str(order.restaurant.id),
-            "totalAmount": float(order.total_amount),
-            "status": order.status,
-            "createdAt": order.created_at.isoformat(),
-            "items": [
-                {
-                    "itemId": str(item.menu.id),
-                    "name": item.menu.name,
-                    "qty": item.quantity,
-                    "price": float(item.price)
-                }
-                for item in order.items.all()
-            ]
-        }
-        orders_list.append(order_dict)
-    
-    return orders_list
+    orders = _orders_queryset(user)
+    if cursor:
+        orders = _after_cursor(orders, _decode_cursor(cursor))
+    
+    # Streaming mode writes a chunk of rows at a time, one JSON object per line
+    if stream:
+        return StreamingResponse(_stream_orders(orders, limit), media_type="application/x-ndjson")
+    
+    limit = limit or ORDERS_PAGE_SIZE
+    page = list(orders[:limit + 1])
+    headers = {}
+    if len(page) > limit:
+        page = page[:limit]
+        headers["X-Next-Cursor"] = _encode_cursor(page[-1])
+    
+    return JSONResponse(list(map(_order_row, page)), headers=headers)
 
-@app.post("/api/orders", response_model=OrderResponse)
-def create_order(order_data: CreateOrderRequest, user: dict = Depends(get_current_user)):
+@app.get("/api/orders/events")
+async def get_order_events(user: dict = Depends(get_current_user)):
+    """Server-Sent Events for orders created and changed from now on, scoped like get_orders.
+    
+    ``order.created`` carries the order as listed by GET /api/orders;
+    ``order.cancelled`` and ``order.updated`` carry it without its items.
+    ``resync`` means events may have been missed: reload the list.
+    """
     if user["role"] == "member":
-        raise HTTPException(status_code=403, detail="Members cannot place orders")
+        raise HTTPException(status_code=403, detail="Members cannot view orders")
     
-    user_obj = User.objects.get(id=user["id"])
+    scope = None if user["role"] == "admin" else user["country"]
+    return StreamingResponse(
+        ORDER_EVENTS.stream(scope),
+        media_type="text/event-stream",
+        # No caching, and no response buffering by nginx and similar proxies
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+def _place_order(user: dict, restaurant_id, lines) -> Order:
+    """Validate and write an order for ``lines`` of (menu_id, quantity).
     
+    Costs a constant number of queries whatever the number of lines, and
+    writes the order, its items and its summary in one transaction.
+    """
     try:
-        restaurant_obj = Restaurant.objects.get(id=order_data.restaurantId)
-    except Restaurant.DoesNotExist:
+        restaurant_obj = Restaurant.objects.only("id", "name", "country").get(id=restaurant_id)
+    except (Restaurant.DoesNotExist, ValidationError):
         raise HTTPException(status_code=404, detail="Restaurant not found")
     
     # Managers can only create orders for restaurants in their country
     if user["role"] == "manager" and restaurant_obj.country != user["country"]:
         raise HTTPException(status_code=403, detail="Cannot create orders for restaurants outside your country")
     
-    # Create order
-    order = Order.objects.create(
-        user=user_obj,
-        restaurant=restaurant_obj,
-        total_amount=order_data.totalAmount,
-        status='confirmed'
-    )
+    # One query for every menu in the order; prices come from the catalog, not the client
+    menu_ids = {menu_id for menu_id, _ in lines}
+    menus = {
+        menu_id: (name, price)
+        for menu_id, name, price in Menu.objects.filter(
+            id__in=menu_ids, restaurant_id=restaurant_obj.id
+        ).values_list("id", "name", "price")
+    }
+    missing = menu_ids - menus.keys()
+    if missing:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Menu items not found at this restaurant: {', '.join(sorted(str(m) for m in missing))}"
+        )
+    
+    total_amount = sum(menus[menu_id][1] * quantity for menu_id, quantity in lines)
     
-    # Create order items
-    for item in order_data.items:
-        menu_obj = Menu.objects.get(id=item["menuId"])
-        OrderItem.objects.create(
-            order=order,
-            menu=menu_obj,
-            quantity=item["quantity"],
-            price=item["price"]
+    # Order, items and the read-model row are written together or not at all
+    with transaction.atomic():
+        order = Order.objects.create(
+            user_id=user["id"],
+            restaurant_id=restaurant_obj.id,
+            total_amount=total_amount,
+            status='confirmed'
         )
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, menu_id=menu_id, quantity=quantity, price=menus[menu_id][1])
+            for menu_id, quantity in lines
+        ])
+        summary = build_summary(
+            order,
+            User(id=user["id"], email=user["email"], name=user["name"]),
+            restaurant_obj,
+            [summary_item(menu_id, menus[menu_id][0], quantity, menus[menu_id][1]) for menu_id, quantity in lines],
+        )
+        summary.save(force_insert=True)
+        ORDER_EVENTS.publish([(
+            order_events.CREATED,
+            restaurant_obj.country,
+            _order_row([getattr(summary, column) for column in ORDER_SUMMARY_COLUMNS]),
+        )])
+        transaction.on_commit(metrics.ORDERS_CREATED.inc)
     
+    return order
+
+def _order_response(order: Order) -> dict:
     return {
-        "id": str(order.id),
-        "userId": str(order.user.id),
-        "restaurantId": str(order.restaurant.id),
-        "totalAmount": float(order.total_amount),
+        "id": order.id,
+        "userId": order.user_id,
+        "restaurantId": order.restaurant_id,
+        "totalAmount": order.total_amount,
         "status": order.status,
-        "createdAt": order.created_at.isoformat()
+        "version": order.version,
+        "createdAt": order.created_at
     }
 
-@app.post("/api/orders/{order_id}/cancel")
-def cancel_order(order_id: str, user: dict = Depends(get_current_user)):
+@app.post("/api/orders", response_model=OrderResponse)
+@db_endpoint
+def create_order(order_data: CreateOrderRequest, user: dict = Depends(get_current_user)):
     if user["role"] == "member":
-        raise HTTPException(status_code=403, detail="Members cannot cancel orders")
-    
-    try:
-        order = Order.objects.select_related('restaurant').get(id=order_id)
-    except Order.DoesNotExist:
-        raise HTTPException(status_code=404, detail="Order not found")
-    
-    # Managers can only cancel orders for restaurants in their country
-    if user["role"] == "manager" and order.restaurant.country != user["country"]:
-        raise HTTPException(status_code=403, detail="Cannot cancel orders for restaurants outside your country")
+        raise HTTPException(status_code=403, detail="Members cannot place orders")
     
-    order.status = 'cancelled'
-    order.save()
+    if not order_data.items:
+        raise HTTPException(status_code=400, detail="Order must contain at least one item")
     
+    order = _place_order(
+        user, order_data.restaurantId, [(item.menuId, item.quantity) for item in order_data.items]
+    )
+    return JSONResponse(_order_response(order))
+
+# Keys for Order.objects.TRANSITION_COLUMNS; the restaurant country that follows them is left out
+_transitioned_order = row_encoder("id", "userId", "restaurantId", "totalAmount", "status", "createdAt", "version")
+
+def _publish_transitions(rows):
+    ORDER_EVENTS.publish([
+        (order_events.status_event(row[4]), row[7], _transitioned_order(row)) for row in rows
+    ])
+
+def _transition_failure(current, status: str, version: Optional[int], user: dict):
+    """(HTTP status, message) for an order that Order.objects.transition() left unchanged.
+    
+    ``current`` is its (status, version, restaurant country), or None if it does not exist.
+    """
+    if current is None:
+        return 404, "Order not found"
+    current_status, current_version, country = current
+    if user["role"] == "manager" and country != user["country"]:
+        return 403, "Cannot change orders for restaurants outside your country"
+    if current_status not in Order.TRANSITIONS[status]:
+        return 409, f"Cannot move an order from {current_status} to {status}"
+    if version is not None and current_version != version:
+        return 409, f"Order was modified, current version is {current_version}"
+    # Changed by someone else between the update and this read
+    return 409, "Order was modified, retry"
+
+def _current_orders(order_ids):
     return {
-        "id": str(order.id),
-        "userId": str(order.user.id),
-        "restaurantId": str(order.restaurant.id),
-        "totalAmount": float(order.total_amount),
-        "status": order.status,
-        "createdAt": order.created_at.isoformat()
+        order_id: (order_status, version, country)
+        for order_id, order_status, version, country in Order.objects.filter(id__in=order_ids).values_list(
+            "id", "status", "version", "restaurant__country"
+        )
     }
 
+@app.post("/api/orders/{order_id}/cancel", response_model=OrderResponse)
+@db_endpoint
+def cancel_order(
+    order_id: UUID,
+    cancel: Optional[CancelOrderRequest] = None,
+    user: dict = Depends(get_current_user)
+):
+    if user["role"] == "member":
+        raise HTTPException(status_code=403, detail="Members cannot cancel orders")
+    
+    # One conditional UPDATE: two concurrent cancels, or a cancel racing another
+    # status change, cannot both succeed. Managers are limited to their country.
+    version = cancel.version if cancel else None
+    country = user["country"] if user["role"] == "manager" else None
+    rows = Order.objects.transition([order_id], "cancelled", country=country, version=version)
+    if rows:
+        _publish_transitions(rows)
+        return JSONResponse(_transitioned_order(rows[0]))
+    
+    code, message = _transition_failure(_current_orders([order_id]).get(order_id), "cancelled", version, user)
+    raise HTTPException(status_code=code, detail=message)
+
+@app.post("/api/orders/status", response_model=OrderStatusResponse)
+@db_endpoint
+def update_order_status(update: OrderStatusRequest, user: dict = Depends(get_current_user)):
+    """Move a batch of orders to one status, e.g. a kitchen marking tickets as preparing.
+    
+    Orders that cannot make the transition are listed under ``failed`` and do
+    not stop the others.
+    """
+    if user["role"] == "member":
+        raise HTTPException(status_code=403, detail="Members cannot change orders")
+    if update.status not in Order.TRANSITIONS:
+        raise HTTPException(
+            status_code=400, detail=f"status must be one of: {', '.join(Order.TRANSITIONS)}"
+        )
+    order_ids = list(dict.fromkeys(update.orderIds))
+    if len(order_ids) > ORDER_STATUS_MAX_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {ORDER_STATUS_MAX_BATCH} orders per request")
+    
+    country = user["country"] if user["role"] == "manager" else None
+    rows = Order.objects.transition(order_ids, update.status, country=country)
+    _publish_transitions(rows)
+    changed = {row[0] for row in rows}
+    
+    # Only read when something did not change, to tell the caller why
+    failed = []
+    unchanged = [order_id for order_id in order_ids if order_id not in changed]
+    if unchanged:
+        current = _current_orders(unchanged)
+        for order_id in unchanged:
+            code, message = _transition_failure(current.get(order_id), update.status, None, user)
+            failed.append({
+                "id": order_id,
+                "error": message,
+                "status": current[order_id][0] if code == 409 else None
+            })
+    
+    return JSONResponse({"updated": list(map(_transitioned_order, rows)), "failed": failed})
+
+PAYMENT_METHOD_COLUMNS = ("id", "user_id", "card_last4", "type")
+_payment_method_row = row_encoder("id", "userId", "cardLast4", "type")
+
 @app.get("/api/payment-methods", response_model=List[PaymentMethodResponse])
+@db_endpoint
 def get_payment_methods(user: dict = Depends(get_current_user)):
     if user["role"] == "admin":
         methods = PaymentMethod.objects.all()
     else:
         methods = PaymentMethod.objects.filter(user_id=user["id"])
     
-    return [
-        {
-            "id": str(m.id),
-            "userId": str(m.user.id),
-            "cardLast4": m.card_last4,
-            "type": m.type
-        }
-        for m in methods
-    ]
+    return JSONResponse(list(map(_payment_method_row, methods.values_list(*PAYMENT_METHOD_COLUMNS))))
 
 @app.post("/api/payment-methods", response_model=PaymentMethodResponse)
+@db_endpoint
 def create_payment_method(pm_data: CreatePaymentMethodRequest, user: dict = Depends(get_current_user)):
     if user["role"] == "member":
         raise HTTPException(status_code=403, detail="Members cannot update payment methods")
@@ -335,101 +720,155 @@ def create_payment_method(pm_data: CreatePaymentMethodRequest, user: dict = Depe
         type=pm_data.type
     )
     
-    return {
-        "id": str(pm.id),
-        "userId": str(pm.user.id),
+    return JSONResponse({
+        "id": pm.id,
+        "userId": pm.user_id,
         "cardLast4": pm.card_last4,
         "type": pm.type
-    }
+    })
 
 # Cart endpoints using Django ORM
+CART_ITEM_COLUMNS = ("id", "menu_id", "menu__name", "quantity", "price", "restaurant_id")
+_cart_item_row = row_encoder("id", "menuId", "name", "quantity", "price", "restaurantId")
+
 @app.get("/api/cart", response_model=List[CartItemResponse])
+@db_endpoint
 def get_cart(user: dict = Depends(get_current_user)):
-    user_obj = User.objects.get(id=user["id"])
-    
-    if user["role"] == "admin":
-        cart_items = CartItem.objects.filter(user=user_obj).select_related('menu', 'restaurant').order_by('-created_at')
-    else:
+    cart_items = CartItem.objects.filter(user_id=user["id"])
+    if user["role"] != "admin":
         # Managers and members can only see cart items from their country
-        cart_items = CartItem.objects.filter(
-            user=user_obj,
-            restaurant__country=user["country"]
-        ).select_related('menu', 'restaurant').order_by('-created_at')
-    
-    return [
-        {
-            "id": str(item.id),
-            "menuId": str(item.menu.id),
-            "name": item.menu.name,
-            "quantity": item.quantity,
-            "price": float(item.price),
-            "restaurantId": str(item.restaurant.id)
-        }
-        for item in cart_items
-    ]
+        cart_items = cart_items.filter(restaurant__country=user["country"])
+    cart_items = cart_items.order_by('-created_at').values_list(*CART_ITEM_COLUMNS)
+    
+    return JSONResponse(list(map(_cart_item_row, cart_items)))
 
 @app.post("/api/cart")
+@db_endpoint
 def add_to_cart(cart_item: AddToCartRequest, user: dict = Depends(get_current_user)):
-    user_obj = User.objects.get(id=user["id"])
-    
     try:
         menu_obj = Menu.objects.select_related('restaurant').get(id=cart_item.menuId)
-        restaurant_obj = Restaurant.objects.get(id=cart_item.restaurantId)
-    except (Menu.DoesNotExist, Restaurant.DoesNotExist):
+    except (Menu.DoesNotExist, ValidationError):
         raise HTTPException(status_code=404, detail="Menu or restaurant not found")
     
-    # Managers and members can only add items from their country's restaurants
-    if user["role"] in ["manager", "member"] and restaurant_obj.country != user["country"]:
-        raise HTTPException(status_code=403, detail="Cannot add items from restaurants outside your country")
-    
-    # Verify menu belongs to the restaurant and matches user's country
-    if menu_obj.restaurant.id != restaurant_obj.id:
+    # Verify menu belongs to the restaurant
+    if str(menu_obj.restaurant_id) != cart_item.restaurantId:
         raise HTTPException(status_code=400, detail="Menu does not belong to this restaurant")
     
+    # Managers and members can only add items from their country's restaurants
     if user["role"] in ["manager", "member"] and menu_obj.restaurant.country != user["country"]:
         raise HTTPException(status_code=403, detail="Cannot add items from restaurants outside your country")
     
-    # Check if item already exists in cart
-    existing = CartItem.objects.filter(user=user_obj, menu=menu_obj).first()
-    
-    if existing:
-        # Update quantity
-        existing.quantity += cart_item.quantity
-        existing.price = cart_item.price
-        existing.save()
-        item = existing
-    else:
-        # Create new cart item
-        item = CartItem.objects.create(
-            user=user_obj,
-            menu=menu_obj,
-            restaurant=restaurant_obj,
-            quantity=cart_item.quantity,
-            price=cart_item.price
-        )
+    # Insert or add to the existing quantity in a single statement
+    [(item_id, menu_id, quantity)] = CartItem.objects.add_quantities(
+        user["id"], [(menu_obj.id, menu_obj.restaurant_id, cart_item.quantity, cart_item.price)]
+    )
     
     return {
-        "id": str(item.id),
-        "menuId": str(item.menu.id),
-        "name": item.menu.name,
-        "quantity": item.quantity,
-        "price": float(item.price),
-        "restaurantId": str(item.restaurant.id)
+        "id": str(item_id),
+        "menuId": str(menu_id),
+        "name": menu_obj.name,
+        "quantity": quantity,
+        "price": cart_item.price,
+        "restaurantId": str(menu_obj.restaurant_id)
     }
 
+@app.patch("/api/cart", response_model=List[CartItemResponse])
+@db_endpoint
+def update_cart(operations: List[CartOperation], user: dict = Depends(get_current_user)):
+    if len(operations) > CART_MAX_OPERATIONS:
+        raise HTTPException(status_code=400, detail=f"At most {CART_MAX_OPERATIONS} operations per request")
+    
+    deltas = {}
+    for op in operations:
+        deltas[op.menuId] = deltas.get(op.menuId, 0) + op.quantityDelta
+    deltas = {menu_id: delta for menu_id, delta in deltas.items() if delta}
+    if not deltas:
+        return []
+    
+    # One query validates every menu and its restaurant's country
+    menus = {
+        menu_id: (restaurant_id, country, name, price)
+        for menu_id, restaurant_id, country, name, price in Menu.objects.filter(
+            id__in=deltas.keys()
+        ).values_list("id", "restaurant_id", "restaurant__country", "name", "price")
+    }
+    missing = deltas.keys() - menus.keys()
+    if missing:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Menu items not found: {', '.join(sorted(str(m) for m in missing))}"
+        )
+    
+    # Managers and members can only add items from their country's restaurants
+    if user["role"] in ["manager", "member"] and any(menu[1] != user["country"] for menu in menus.values()):
+        raise HTTPException(status_code=403, detail="Cannot add items from restaurants outside your country")
+    
+    # Apply every delta in one upsert, then drop rows that reached zero
+    with transaction.atomic():
+        rows = CartItem.objects.add_quantities(user["id"], [
+            (menu_id, menus[menu_id][0], delta, menus[menu_id][3])
+            for menu_id, delta in deltas.items()
+        ])
+        emptied = [item_id for item_id, _, quantity in rows if quantity <= 0]
+        if emptied:
+            CartItem.objects.filter(id__in=emptied).delete()
+    
+    return JSONResponse([
+        _cart_item_row((item_id, menu_id, menus[menu_id][2], quantity, menus[menu_id][3], menus[menu_id][0]))
+        for item_id, menu_id, quantity in rows
+        if quantity > 0
+    ])
+
+@app.post("/api/cart/checkout", response_model=OrderResponse)
+@db_endpoint
+def checkout_cart(checkout: Optional[CheckoutRequest] = None, user: dict = Depends(get_current_user)):
+    if user["role"] == "member":
+        raise HTTPException(status_code=403, detail="Members cannot place orders")
+    
+    restaurant_id = checkout.restaurantId if checkout else None
+    
+    # Cart rows stay locked until the order is written and they are deleted,
+    # so a concurrent add or a second checkout cannot interleave
+    with transaction.atomic():
+        cart = list(
+            CartItem.objects.select_for_update()
+            .filter(user_id=user["id"])
+            .values_list("id", "menu_id", "restaurant_id", "quantity")
+        )
+        if not cart:
+            raise HTTPException(status_code=400, detail="Cart is empty")
+        
+        if restaurant_id is None:
+            restaurant_ids = {row[2] for row in cart}
+            if len(restaurant_ids) > 1:
+                raise HTTPException(
+                    status_code=400,
+                    detail="Cart contains items from several restaurants, specify restaurantId"
+                )
+            restaurant_id = restaurant_ids.pop()
+        
+        rows = [row for row in cart if str(row[2]) == str(restaurant_id)]
+        if not rows:
+            raise HTTPException(status_code=400, detail="Cart has no items from this restaurant")
+        
+        order = _place_order(user, restaurant_id, [(menu_id, quantity) for _, menu_id, _, quantity in rows])
+        CartItem.objects.filter(id__in=[row[0] for row in rows]).delete()
+    
+    return JSONResponse(_order_response(order))
+
 @app.delete("/api/cart")
+@db_endpoint
 def remove_from_cart(itemId: str, user: dict = Depends(get_current_user)):
-    user_obj = User.objects.get(id=user["id"])
-    
     try:
-        item = CartItem.objects.get(id=itemId, user=user_obj)
-        item.delete()
-        return {"success": True}
-    except CartItem.DoesNotExist:
+        deleted, _ = CartItem.objects.filter(id=itemId, user_id=user["id"]).delete()
+    except ValidationError:
+        deleted = 0
+    if not deleted:
         raise HTTPException(status_code=404, detail="Cart item not found")
+    return {"success": True}
 
 @app.post("/api/cart/clear")
+@db_endpoint
 def clear_cart(user: dict = Depends(get_current_user)):
-    user_obj = User.objects.get(id=user["id"])
-    CartItem.objects.filter(user=user_obj).delete()
+    CartItem.objects.filter(user_id=user["id"]).delete()
     return {"success": True}
@@ -0,0 +1,193 @@
+"""Prometheus metrics for GET /metrics.
+
+Request latency (by method, route template and status), in-flight requests,
+open Server-Sent Events streams and created orders are recorded as they
+happen. A stream counts as a request until its headers are sent, and its
+latency is the time to those headers; from then on it counts as an open
+stream, however long the client listens. Values that live in other
+objects are copied into gauges and counters by MetricsSampler every
+METRICS_SAMPLE_INTERVAL seconds and on each scrape:
+- session store size;
+- catalog cache entries, hits and misses;
+- DB executor threads, calls in flight and calls running, the time calls
+  spent waiting for a DB thread and getting a usable connection, and the
+  number of connections open and opened.
+
+With several uvicorn workers, start every worker with PROMETHEUS_MULTIPROC_DIR
+pointing at the same empty directory. prometheus_client then keeps each
+worker's values in memory-mapped files there, and any worker's /metrics
+aggregates all of them. Without it, /metrics reports the current process only.
+"""
+import os
+import threading
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+from django.db import close_old_connections
+
+from fastapi_app.query_stats import is_event_stream
+from fastapi_app.sessions import MemorySessionStore
+
+MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "HTTP requests being served", multiprocess_mode="livesum"
+)
+EVENT_STREAMS_OPEN = Gauge(
+    "event_streams_open", "Server-Sent Events streams being served", multiprocess_mode="livesum"
+)
+ORDERS_CREATED = Counter("orders_created", "Orders created, including cart checkouts")
+CATALOG_CACHE_HITS = Counter("catalog_cache_hits", "Catalog responses served from the cache")
+CATALOG_CACHE_MISSES = Counter("catalog_cache_misses", "Catalog responses built from the database")
+CATALOG_CACHE_ENTRIES = Gauge(
+    "catalog_cache_entries", "Responses held in the catalog cache", multiprocess_mode="livesum"
+)
+DB_EXECUTOR_THREADS = Gauge(
+    "db_executor_threads", "Threads available for ORM calls", multiprocess_mode="livesum"
+)
+DB_CALLS_IN_FLIGHT = Gauge(
+    "db_calls_in_flight", "ORM calls submitted and not finished (queued or running)", multiprocess_mode="livesum"
+)
+DB_CALLS_RUNNING = Gauge("db_calls_running", "ORM calls running on a DB thread", multiprocess_mode="livesum")
+DB_CALLS = Counter("db_calls", "ORM calls run on the DB executor")
+DB_WAIT = Counter("db_executor_wait_seconds", "Time ORM calls spent queued for a DB thread")
+DB_ACQUIRE = Counter(
+    "db_connection_acquire_seconds", "Time spent getting a usable connection (reconnects, health checks)"
+)
+DB_CONNECTIONS_OPENED = Counter("db_connections_opened", "Database connections opened")
+DB_CONNECTIONS_OPEN = Gauge("db_connections_open", "Database connections held open", multiprocess_mode="livesum")
+
+
+class MetricsSampler:
+    def __init__(self, sessions, catalog_cache, executor_usage):
+        self.sessions = sessions
+        self.catalog_cache = catalog_cache
+        self.executor_usage = executor_usage
+        # A shared store reports the same total from every worker
+        sessions_shared = not isinstance(sessions, MemorySessionStore)
+        self.sessions_active = Gauge(
+            "sessions_active",
+            "Unexpired sessions in the session store",
+            multiprocess_mode="livemax" if sessions_shared else "livesum",
+        )
+        self._lock = threading.Lock()
+        # counter -> total already added to it
+        self._seen = {}
+        self._thread = None
+
+    def _advance(self, counter: Counter, total: float) -> None:
+        # Called with self._lock held
+        counter.inc(total - self._seen.get(counter, 0))
+        self._seen[counter] = total
+
+    def sample(self) -> None:
+        cache = self.catalog_cache.stats()
+        usage = self.executor_usage.stats()
+        with self._lock:
+            self._advance(CATALOG_CACHE_HITS, cache["hits"])
+            self._advance(CATALOG_CACHE_MISSES, cache["misses"])
+            self._advance(DB_CALLS, usage["calls"])
+            self._advance(DB_WAIT, usage["wait_seconds"])
+            self._advance(DB_ACQUIRE, usage["acquire_seconds"])
+            self._advance(DB_CONNECTIONS_OPENED, usage["connections_opened"])
+        CATALOG_CACHE_ENTRIES.set(cache["entries"])
+
+        DB_EXECUTOR_THREADS.set(usage["threads"])
+        DB_CALLS_IN_FLIGHT.set(usage["in_flight"])
+        DB_CALLS_RUNNING.set(usage["running"])
+        DB_CONNECTIONS_OPEN.set(usage["connections_open"])
+
+        self.sessions_active.set(len(self.sessions))
+
+    def start(self, interval: float) -> None:
+        if self._thread is not None:
+            return
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(interval,), name="metrics-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        if MULTIPROCESS:
+            # Drop this worker's "live" gauges from the aggregate
+            multiprocess.mark_process_dead(os.getpid())
+
+    def _run(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            self.sample()
+            close_old_connections()
+
+
+def render() -> bytes:
+    if not MULTIPROCESS:
+        return generate_latest(REGISTRY)
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency and in-flight count per HTTP request.
+
+    Requests are labelled with the route template (``/api/orders/{order_id}/cancel``)
+    rather than the path, so label cardinality stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+        streaming = False
+
+        async def send_with_status(message):
+            nonlocal status_code, streaming
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if is_event_stream(message.get("headers", [])):
+                    streaming = True
+                    self.observe(scope, status_code, start)
+                    REQUESTS_IN_FLIGHT.dec()
+                    EVENT_STREAMS_OPEN.inc()
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            if streaming:
+                EVENT_STREAMS_OPEN.dec()
+            else:
+                REQUESTS_IN_FLIGHT.dec()
+                self.observe(scope, status_code, start)
+
+    def observe(self, scope, status_code: int, start: float) -> None:
+        route = scope.get("route")
+        REQUEST_LATENCY.labels(
+            scope["method"], route.path if route is not None else "unmatched", str(status_code)
+        ).observe(time.perf_counter() - start)
@@ -0,0 +1,234 @@
+"""Order events for GET /api/orders/events (Server-Sent Events).
+
+Handlers publish an event when an order is created (``order.created``),
+cancelled (``order.cancelled``) or moved to another status
+(``order.updated``). Each worker fans events out to the streams it serves:
+every stream has a bounded buffer on the event loop, and a stream that falls
+ORDER_EVENTS_MAX_PENDING events behind is closed rather than buffered
+without limit. EventSource reconnects on its own; clients reload GET
+/api/orders after a reconnect, since events sent while they were away are
+not replayed.
+
+ORDER_EVENTS_BACKEND selects how events reach the workers:
+- "memory": fanned out in the publishing process, once the transaction
+  commits. Enough for a single worker.
+- "postgres": sent with NOTIFY on the ``order_events`` channel from the
+  publishing transaction, so PostgreSQL delivers it to every worker on
+  commit and drops it on rollback. Each worker LISTENs on a connection of
+  its own and fans out what it receives, its own events included.
+- "auto" (default): postgres on PostgreSQL, memory otherwise.
+"""
+import asyncio
+import logging
+import os
+import select
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+
+import orjson
+from django.db import connection, connections, transaction
+
+from fastapi_app.serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_INTERVAL = float(os.environ.get("ORDER_EVENTS_HEARTBEAT", "15"))
+MAX_PENDING = int(os.environ.get("ORDER_EVENTS_MAX_PENDING", "1000"))
+# Milliseconds EventSource waits before reconnecting
+RETRY_MS = 3000
+
+CREATED = "order.created"
+CANCELLED = "order.cancelled"
+UPDATED = "order.updated"
+
+
+def frame(event_type: str, data) -> bytes:
+    return b"event: " + event_type.encode() + b"\ndata: " + dumps(data) + b"\n\n"
+
+
+def status_event(status: str) -> str:
+    return CANCELLED if status == "cancelled" else UPDATED
+
+
+class _Stream:
+    def __init__(self, country):
+        # None for admins, who see every country
+        self.country = country
+        self.pending = deque()
+        self.ready = asyncio.Event()
+        self.overflowed = False
+
+
+class OrderEvents(ABC):
+    def __init__(self, heartbeat: float = HEARTBEAT_INTERVAL, max_pending: int = MAX_PENDING):
+        self.heartbeat = heartbeat
+        self.max_pending = max_pending
+        self._streams = set()
+        self._loop = None
+
+    def start(self) -> None:
+        # Called from the lifespan, on the event loop that serves the streams
+        self._loop = asyncio.get_running_loop()
+
+    def stop(self) -> None:
+        self._loop = None
+
+    @abstractmethod
+    def publish(self, events) -> None:
+        """Publish (type, restaurant country, order) ``events`` if the current transaction commits.
+
+        Called from a DB thread; ``order`` is shaped as in GET /api/orders.
+        """
+
+    def _call(self, callback, *args) -> None:
+        # From any thread: run ``callback`` on the event loop, if the app has started
+        loop = self._loop
+        if loop is not None:
+            loop.call_soon_threadsafe(callback, *args)
+
+    def _fan_out(self, events) -> None:
+        # On the event loop, so streams need no lock; each event is encoded once
+        for event_type, country, order in events:
+            data = None
+            for stream in self._streams:
+                if stream.overflowed or (stream.country is not None and stream.country != country):
+                    continue
+                if len(stream.pending) >= self.max_pending:
+                    stream.overflowed = True
+                else:
+                    data = data or frame(event_type, order)
+                    stream.pending.append(data)
+                stream.ready.set()
+
+    def _broadcast(self, event_type: str) -> None:
+        data = frame(event_type, {})
+        for stream in self._streams:
+            stream.pending.append(data)
+            stream.ready.set()
+
+    async def stream(self, country):
+        """Server-Sent Events for orders at restaurants in ``country``, or everywhere if None."""
+        stream = _Stream(country)
+        self._streams.add(stream)
+        try:
+            yield f"retry: {RETRY_MS}\n\n".encode()
+            while True:
+                try:
+                    await asyncio.wait_for(stream.ready.wait(), self.heartbeat)
+                except asyncio.TimeoutError:
+                    # Comment line: keeps proxies from timing out an idle stream
+                    yield b": keepalive\n\n"
+                    continue
+                stream.ready.clear()
+                chunk = b"".join(stream.pending)
+                stream.pending.clear()
+                if chunk:
+                    yield chunk
+                if stream.overflowed:
+                    return
+        finally:
+            self._streams.discard(stream)
+
+
+class MemoryOrderEvents(OrderEvents):
+    def publish(self, events) -> None:
+        events = list(events)
+        transaction.on_commit(lambda: self._call(self._fan_out, events))
+
+
+class PostgresOrderEvents(OrderEvents):
+    CHANNEL = "order_events"
+    # NOTIFY payloads are limited to 8000 bytes
+    MAX_PAYLOAD = 7900
+    RECONNECT_DELAY = 1.0
+    POLL_INTERVAL = 1.0
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._thread = None
+        self._stop = threading.Event()
+
+    def publish(self, events) -> None:
+        payloads = []
+        for event_type, country, order in events:
+            payload = dumps({"type": event_type, "country": country, "order": order})
+            if len(payload) > self.MAX_PAYLOAD:
+                # Large orders go out without their lines; the client reloads the order list instead
+                order = {key: value for key, value in order.items() if key != "items"}
+                payload = dumps({"type": event_type, "country": country, "order": order})
+            payloads.append(payload.decode())
+        if not payloads:
+            return
+        # Part of the current transaction: delivered on commit, dropped on rollback
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_notify(%s, payload) FROM unnest(%s::text[]) AS payload", [self.CHANNEL, payloads]
+            )
+
+    def start(self) -> None:
+        super().start()
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._listen, name="order-events", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        super().stop()
+
+    def _listen(self) -> None:
+        connected_before = False
+        while not self._stop.is_set():
+            try:
+                conn = self._connect()
+            except Exception:
+                logger.warning("order events: cannot connect to LISTEN, retrying", exc_info=True)
+                self._stop.wait(self.RECONNECT_DELAY)
+                continue
+            if connected_before:
+                # Events may have been missed while disconnected; clients reload their list
+                self._call(self._broadcast, "resync")
+            connected_before = True
+            try:
+                self._receive(conn)
+            except Exception:
+                logger.warning("order events: LISTEN connection lost, reconnecting", exc_info=True)
+            finally:
+                conn.close()
+
+    def _connect(self):
+        # A dedicated connection, outside the ones Django manages for the DB threads
+        wrapper = connections["default"]
+        conn = wrapper.get_new_connection(wrapper.get_connection_params())
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute(f"LISTEN {self.CHANNEL}")
+        return conn
+
+    def _receive(self, conn) -> None:
+        while not self._stop.is_set():
+            if not select.select([conn], [], [], self.POLL_INTERVAL)[0]:
+                continue
+            conn.poll()
+            events = []
+            while conn.notifies:
+                message = orjson.loads(conn.notifies.pop(0).payload)
+                events.append((message["type"], message["country"], message["order"]))
+            if events:
+                self._call(self._fan_out, events)
+
+
+def get_order_events() -> OrderEvents:
+    backend = os.environ.get("ORDER_EVENTS_BACKEND", "auto")
+    if backend == "auto":
+        backend = "postgres" if connection.vendor == "postgresql" else "memory"
+    if backend == "postgres":
+        return PostgresOrderEvents()
+    if backend == "memory":
+        return MemoryOrderEvents()
+    raise ValueError(f"Unknown ORDER_EVENTS_BACKEND: {backend}")
@@ -0,0 +1,149 @@
+"""Per-request SQL instrumentation.
+
+An execute wrapper on every Django connection records each statement's
+duration into the QueryStats of the request that ran it. The stats travel in
+a contextvar, which run_in_db copies into the DB threads, so
+queries are attributed correctly however many threads a request uses.
+
+QueryStatsMiddleware adds a ``Server-Timing`` header (query count and total
+DB time) to every response and writes one JSON log line per request to the
+``fastapi_app.queries`` logger, including the slowest statements
+(parameterized SQL only, never the values). Requests running more than
+QUERY_STATS_MAX_QUERIES statements are logged at WARNING with
+``"flagged": true``; set QUERY_STATS=0 to switch the instrumentation off.
+
+For a streaming response the header reflects the queries run before the
+first byte; the log line is written when the body is complete. Server-Sent
+Events streams stay open for as long as the client listens, so theirs is
+written when the headers are sent instead.
+"""
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+QUERY_STATS = os.environ.get("QUERY_STATS", "1") == "1"
+QUERY_STATS_MAX_QUERIES = int(os.environ.get("QUERY_STATS_MAX_QUERIES", "0"))
+QUERY_STATS_SLOWEST = int(os.environ.get("QUERY_STATS_SLOWEST", "3"))
+SQL_LOG_LENGTH = 500
+
+logger = logging.getLogger("fastapi_app.queries")
+
+_current = contextvars.ContextVar("query_stats", default=None)
+
+
+class QueryStats:
+    def __init__(self, keep_slowest: int = 3):
+        self.keep_slowest = keep_slowest
+        self.count = 0
+        self.duration = 0.0
+        # (duration, sql), slowest first
+        self.slowest = []
+        # A request may run queries on several DB threads at once
+        self._lock = threading.Lock()
+
+    def record(self, sql: str, duration: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.duration += duration
+            if len(self.slowest) < self.keep_slowest or duration > self.slowest[-1][0]:
+                self.slowest.append((duration, sql))
+                self.slowest.sort(key=lambda entry: entry[0], reverse=True)
+                del self.slowest[self.keep_slowest:]
+
+
+def _record_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.record(sql, time.perf_counter() - start)
+
+
+def _add_wrapper(sender, connection, **kwargs):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+def install() -> None:
+    """Wrap every connection, including those the DB threads open later."""
+    connection_created.connect(_add_wrapper, weak=False)
+    for connection in connections.all(initialized_only=True):
+        _add_wrapper(None, connection)
+
+
+def server_timing(stats: QueryStats, elapsed: float) -> str:
+    queries = "1 query" if stats.count == 1 else f"{stats.count} queries"
+    return f'db;dur={stats.duration * 1000:.2f};desc="{queries}", app;dur={elapsed * 1000:.2f}'
+
+
+def is_event_stream(headers) -> bool:
+    """Whether response ``headers`` (ASGI, lowercase names) start a Server-Sent Events stream."""
+    return any(name == b"content-type" and value.startswith(b"text/event-stream") for name, value in headers)
+
+
+class QueryStatsMiddleware:
+    """ASGI middleware that collects QueryStats for each HTTP request."""
+
+    def __init__(self, app, max_queries: int = 0, keep_slowest: int = 3):
+        self.app = app
+        self.max_queries = max_queries
+        self.keep_slowest = keep_slowest
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats(self.keep_slowest)
+        token = _current.set(stats)
+        start = time.perf_counter()
+        status_code = 500
+        logged = False
+
+        async def send_with_timing(message):
+            nonlocal status_code, logged
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+                elapsed = time.perf_counter() - start
+                headers.append((b"server-timing", server_timing(stats, elapsed).encode()))
+                if is_event_stream(headers):
+                    logged = True
+                    self.log(scope, status_code, stats, elapsed)
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            if not logged:
+                self.log(scope, status_code, stats, time.perf_counter() - start)
+
+    def log(self, scope, status_code: int, stats: QueryStats, elapsed: float) -> None:
+        flagged = 0 < self.max_queries < stats.count
+        level = logging.WARNING if flagged else logging.INFO
+        if not logger.isEnabledFor(level):
+            return
+        logger.log(level, json.dumps({
+            "method": scope["method"],
+            "path": scope["path"],
+            "status": status_code,
+            "duration_ms": round(elapsed * 1000, 2),
+            "queries": stats.count,
+            "db_ms": round(stats.duration * 1000, 2),
+            "flagged": flagged,
+            "slowest": [
+                {"ms": round(duration * 1000, 2), "sql": sql[:SQL_LOG_LENGTH]}
+                for duration, sql in stats.slowest
+            ],
+        }))
@@ -0,0 +1,197 @@
+"""Full-text search over the menu catalog for /api/search.
+
+Results are menu items. An item matches when every query term is a prefix of
+a word in its name or description, or in its restaurant's name or
+description; terms shorter than SEARCH_MIN_PREFIX must match a whole word.
+Items are ranked with name > description > restaurant name > restaurant
+description, ties broken by id. Only the SEARCH_MAX_CANDIDATES matches with
+the smallest ids are ranked, so the cost of a query is bounded however many
+items it matches, and the same query always ranks the same candidates.
+
+On PostgreSQL the query runs against api_menu.search_vector and
+search_country and their indexes (api/migrations/0011_menu_search_vector.py
+and 0012_menu_search_country.py). Other databases (SQLite in
+development) use an in-process inverted index, rebuilt whenever the catalog
+version changes. SEARCH_BACKEND=auto|postgres|memory overrides the choice.
+"""
+import bisect
+import heapq
+import os
+import re
+import threading
+from typing import List, Optional
+
+from django.db import connection
+
+from api.models import Menu
+
+MAX_TERMS = 8
+MIN_PREFIX = int(os.environ.get("SEARCH_MIN_PREFIX", "3"))
+MAX_CANDIDATES = int(os.environ.get("SEARCH_MAX_CANDIDATES", "2000"))
+
+# ts_rank's default weights for A, B, C and D
+WEIGHTS = (1.0, 0.4, 0.2, 0.1)
+
+
+def _words(text: str) -> List[str]:
+    return re.findall(r"[^\W_]+", text.lower())
+
+
+def _terms(q: str) -> List[str]:
+    return _words(q)[:MAX_TERMS]
+
+
+def _result(menu_id, restaurant_id, restaurant_name, name, price, description, rank) -> dict:
+    return {
+        "id": str(menu_id),
+        "restaurantId": str(restaurant_id),
+        "restaurantName": restaurant_name,
+        "name": name,
+        "price": float(price),
+        "description": description,
+        "rank": float(rank),
+    }
+
+
+class PostgresSearch:
+    # Candidates are the MAX_CANDIDATES matches with the smallest ids, whichever
+    # plan finds them, so a page does not depend on the plan; only they are
+    # ranked, from the stored vector. Walking the (search_country, id) or
+    # primary key index stops at the last candidate, after about candidates *
+    # scope / matches rows: cheap for a broad query. Otherwise the fence
+    # (OFFSET 0) keeps the GIN index in use, and all matches are read and
+    # sorted by id. The planner's estimates are good but its costs often pick
+    # the walk where it reads far more, so the choice is made here.
+    SCOPE = "SELECT 1 FROM api_menu m WHERE TRUE {where}"
+    MATCHES = """
+        SELECT m.id, m.restaurant_id, m.name, m.price, m.description, m.search_vector
+        FROM api_menu m
+        WHERE m.search_vector @@ to_tsquery('english', %s) {where}
+    """
+    WALK = "{matches} ORDER BY m.id LIMIT %s"
+    FENCED = "SELECT * FROM ({matches} OFFSET 0) AS matches ORDER BY id LIMIT %s"
+    SQL = """
+        WITH query AS (SELECT to_tsquery('english', %s) AS q),
+        candidates AS ({candidates})
+        SELECT c.id, c.restaurant_id, r.name, c.name, c.price, c.description, ts_rank(c.search_vector, query.q) AS rank
+        FROM candidates c
+        JOIN api_restaurant r ON r.id = c.restaurant_id,
+        query
+        ORDER BY rank DESC, c.id
+        LIMIT %s OFFSET %s
+    """
+
+    @staticmethod
+    def _estimate(cursor, sql: str, params: list) -> float:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        return cursor.fetchone()[0][0]["Plan"]["Plan Rows"]
+
+    def search(self, q: str, country: Optional[str], limit: int, offset: int) -> List[dict]:
+        terms = _terms(q)
+        if not terms:
+            return []
+        tsquery = " & ".join(f"{term}:*" if len(term) >= MIN_PREFIX else term for term in terms)
+        where, scope_params = "", []
+        if country is not None:
+            where, scope_params = "AND m.search_country = %s", [country]
+        candidates = max(MAX_CANDIDATES, offset + limit)
+        matches = self.MATCHES.format(where=where)
+        with connection.cursor() as cursor:
+            scope = self._estimate(cursor, self.SCOPE.format(where=where), scope_params)
+            found = self._estimate(cursor, matches, [tsquery, *scope_params])
+            # Rows each plan reads: candidates * scope / found for the walk, found for the fence
+            plan = self.WALK if found * found > candidates * scope else self.FENCED
+            cursor.execute(
+                self.SQL.format(candidates=plan.format(matches=matches)),
+                [tsquery, tsquery, *scope_params, candidates, limit, offset],
+            )
+            return [_result(*row) for row in cursor.fetchall()]
+
+
+class InvertedIndex:
+    def __init__(self, rows):
+        # rows: (menu_id, restaurant_id, restaurant_name, name, price, description, restaurant_description, country)
+        self.docs = []
+        self.countries = []
+        postings = {}
+        for doc, row in enumerate(rows):
+            menu_id, restaurant_id, restaurant_name, name, price, description, restaurant_description, country = row
+            self.docs.append((menu_id, restaurant_id, restaurant_name, name, price, description))
+            self.countries.append(country)
+            for text, weight in zip((name, description, restaurant_name, restaurant_description), WEIGHTS):
+                for token in set(_words(text)):
+                    doc_weights = postings.setdefault(token, {})
+                    doc_weights[doc] = doc_weights.get(doc, 0.0) + weight
+        self.postings = postings
+        self.vocabulary = sorted(postings)
+
+    def _prefix_scores(self, term: str) -> dict:
+        if len(term) < MIN_PREFIX:
+            return dict(self.postings.get(term, {}))
+        scores = {}
+        i = bisect.bisect_left(self.vocabulary, term)
+        while i < len(self.vocabulary) and self.vocabulary[i].startswith(term):
+            for doc, weight in self.postings[self.vocabulary[i]].items():
+                if weight > scores.get(doc, 0.0):
+                    scores[doc] = weight
+            i += 1
+        return scores
+
+    def search(self, terms: List[str], country: Optional[str], limit: int, offset: int) -> List[dict]:
+        scores = None
+        for term in terms:
+            term_scores = self._prefix_scores(term)
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {doc: score + term_scores[doc] for doc, score in scores.items() if doc in term_scores}
+            if not scores:
+                return []
+        # Same candidates as PostgresSearch: the matches with the smallest ids
+        matches = [
+            (str(self.docs[doc][0]), doc, score)
+            for doc, score in scores.items()
+            if country is None or self.countries[doc] == country
+        ]
+        candidates = heapq.nsmallest(max(MAX_CANDIDATES, offset + limit), matches)
+        top = heapq.nsmallest(offset + limit, [(-score, menu_id, doc) for menu_id, doc, score in candidates])[offset:]
+        return [_result(*self.docs[doc], -neg_score) for neg_score, _, doc in top]
+
+
+class MemorySearch:
+    def __init__(self, version):
+        # version() returns the current catalog version (see CatalogCache.version)
+        self._version = version
+        self._lock = threading.Lock()
+        self._index = None
+        self._index_version = None
+
+    def _get_index(self) -> InvertedIndex:
+        version = self._version()
+        if self._index is None or self._index_version != version:
+            with self._lock:
+                if self._index is None or self._index_version != version:
+                    rows = Menu.objects.values_list(
+                        "id", "restaurant_id", "restaurant__name", "name", "price", "description",
+                        "restaurant__description", "restaurant__country",
+                    )
+                    self._index = InvertedIndex(rows.iterator())
+                    self._index_version = version
+        return self._index
+
+    def search(self, q: str, country: Optional[str], limit: int, offset: int) -> List[dict]:
+        terms = _terms(q)
+        if not terms:
+            return []
+        return self._get_index().search(terms, country, limit, offset)
+
+
+def get_search_backend(version):
+    backend = os.environ.get("SEARCH_BACKEND", "auto")
+    if backend == "auto":
+        backend = "postgres" if connection.vendor == "postgresql" else "memory"
+    if backend == "postgres":
+        return PostgresSearch()
+    if backend == "memory":
+        return MemorySearch(version)
+    raise ValueError(f"Unknown SEARCH_BACKEND: {backend}")
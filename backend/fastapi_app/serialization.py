@@ -0,0 +1,41 @@
+"""JSON serialization with orjson.
+
+orjson writes UUIDs and datetimes natively (the same strings as str() and
+isoformat()) and is several times faster than the json module. It does not
+handle Decimal, which is written as a float, as the handlers did with
+float() before.
+
+Handlers whose output comes straight from the database return a
+JSONResponse themselves. FastAPI then sends it as is: the output is not
+validated against the route's response_model (which stays, to document the
+schema) and does not go through jsonable_encoder, which costs more than the
+encoding itself on large lists. Their rows are read with ``values_list`` and
+turned into dicts by a row_encoder, so no model instance is built per row.
+"""
+from decimal import Decimal
+
+import orjson
+from starlette import responses
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content) -> bytes:
+    return orjson.dumps(content, default=_default)
+
+
+class JSONResponse(responses.JSONResponse):
+    # A JSONResponse subclass, so the OpenAPI schema still documents response_model
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def row_encoder(*keys: str):
+    """Return a function turning a ``values_list`` row into a dict with ``keys``, in column order."""
+    def encode(row) -> dict:
+        return dict(zip(keys, row))
+    return encode
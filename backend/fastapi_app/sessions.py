@@ -0,0 +1,164 @@
+"""Session stores for the FastAPI app.
+
+SESSION_BACKEND selects the implementation:
+
+- "memory" (default): per-process LRU with TTL expiry. Fine for a single
+  uvicorn worker and used as the stand-in for tests.
+- "database": sessions live in the api_authsession table, so any worker or
+  process can resolve a token.
+"""
+import hashlib
+import heapq
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Optional
+
+from django.db import close_old_connections
+from django.utils import timezone
+
+from api.models import AuthSession
+
+
+class SessionStore(ABC):
+    # True when get/set do blocking I/O and must stay off the event loop
+    blocking = False
+
+    @abstractmethod
+    def get(self, token: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    def set(self, token: str, data: dict, ttl: float) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, token: str) -> None:
+        ...
+
+    @abstractmethod
+    def purge_expired(self) -> int:
+        ...
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+    def start_sweeper(self, interval: float) -> None:
+        if getattr(self, "_sweeper", None) is not None:
+            return
+        self._stop = threading.Event()
+        self._sweeper = threading.Thread(
+            target=self._sweep, args=(interval,), name="session-sweeper", daemon=True
+        )
+        self._sweeper.start()
+
+    def stop_sweeper(self) -> None:
+        if getattr(self, "_sweeper", None) is None:
+            return
+        self._stop.set()
+        self._sweeper.join()
+        self._sweeper = None
+
+    def _sweep(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            self.purge_expired()
+            # The sweeper thread keeps its own connection; recycle it like the DB threads do
+            close_old_connections()
+
+
+class MemorySessionStore(SessionStore):
+    def __init__(self, max_size: int = 100_000, clock=time.monotonic):
+        self.max_size = max_size
+        self._clock = clock
+        self._lock = threading.Lock()
+        # token -> (expires_at, data), least recently used first
+        self._data = OrderedDict()
+        # (expires_at, token); may hold stale entries for deleted or evicted tokens
+        self._expiry = []
+
+    def get(self, token):
+        with self._lock:
+            entry = self._data.get(token)
+            if entry is None:
+                return None
+            if entry[0] <= self._clock():
+                del self._data[token]
+                return None
+            self._data.move_to_end(token)
+            return entry[1]
+
+    def set(self, token, data, ttl):
+        expires_at = self._clock() + ttl
+        with self._lock:
+            self._data[token] = (expires_at, data)
+            self._data.move_to_end(token)
+            heapq.heappush(self._expiry, (expires_at, token))
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+            if len(self._expiry) > 2 * self.max_size:
+                self._expiry = [(exp, tok) for tok, (exp, _) in self._data.items()]
+                heapq.heapify(self._expiry)
+
+    def delete(self, token):
+        with self._lock:
+            self._data.pop(token, None)
+
+    def purge_expired(self):
+        now = self._clock()
+        removed = 0
+        with self._lock:
+            while self._expiry and self._expiry[0][0] <= now:
+                expires_at, token = heapq.heappop(self._expiry)
+                entry = self._data.get(token)
+                if entry is not None and entry[0] == expires_at:
+                    del self._data[token]
+                    removed += 1
+        return removed
+
+    def __len__(self):
+        return len(self._data)
+
+
+class DatabaseSessionStore(SessionStore):
+    blocking = True
+
+    @staticmethod
+    def _key(token):
+        # Only a digest of the token is stored, so a table dump can't be replayed
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token):
+        return (
+            AuthSession.objects.filter(key=self._key(token), expires_at__gt=timezone.now())
+            .values_list("data", flat=True)
+            .first()
+        )
+
+    def set(self, token, data, ttl):
+        AuthSession.objects.update_or_create(
+            key=self._key(token),
+            defaults={"data": data, "expires_at": timezone.now() + timedelta(seconds=ttl)},
+        )
+
+    def delete(self, token):
+        AuthSession.objects.filter(key=self._key(token)).delete()
+
+    def purge_expired(self):
+        removed, _ = AuthSession.objects.filter(expires_at__lte=timezone.now()).delete()
+        return removed
+
+    def __len__(self):
+        return AuthSession.objects.filter(expires_at__gt=timezone.now()).count()
+
+
+def get_session_store() -> SessionStore:
+    backend = os.environ.get("SESSION_BACKEND", "memory")
+    if backend == "memory":
+        return MemorySessionStore(max_size=int(os.environ.get("SESSION_MAX_ENTRIES", "100000")))
+    if backend == "database":
+        return DatabaseSessionStore()
+    raise ValueError(f"Unknown SESSION_BACKEND: {backend}")
@@ -0,0 +1,132 @@
+"""Signed, stateless session tokens (SESSION_TOKENS=signed).
+
+A token carries the user's id, email, name, role and country plus an expiry
+and a random id (jti), signed with HMAC-SHA256 under SECRET_KEY through
+django.core.signing. Verifying one is pure CPU, so any worker can
+authenticate a request without a session lookup.
+
+Logout revokes the token's jti. Revocations are kept in a local set and,
+when the session store is shared (database backend), written there too;
+other workers look a jti up in the store at most once per
+TOKEN_REVOCATION_CHECK_INTERVAL, which bounds how long a revoked token keeps
+working elsewhere.
+"""
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from django.core import signing
+
+from fastapi_app.sessions import MemorySessionStore, SessionStore
+
+SALT = "fastapi_app.tokens"
+
+
+class RevocationList:
+    def __init__(self, store: SessionStore, check_interval: float = 30.0, max_entries: int = 100_000, clock=time.time):
+        self.store = store
+        # A per-process store holds nothing another worker could have written
+        self.shared = not isinstance(store, MemorySessionStore)
+        self.check_interval = check_interval
+        self.max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._revoked = {}
+        # jti -> last time the shared store said it was not revoked
+        self._checked = OrderedDict()
+
+    @staticmethod
+    def _key(jti: str) -> str:
+        return f"revoked:{jti}"
+
+    def revoke(self, jti: str, expires_at: float) -> None:
+        ttl = expires_at - self._clock()
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._revoked[jti] = expires_at
+            self._checked.pop(jti, None)
+            self._prune()
+        if self.shared:
+            self.store.set(self._key(jti), {"exp": expires_at}, ttl)
+
+    def is_revoked(self, jti: str) -> bool:
+        with self._lock:
+            return jti in self._revoked
+
+    def needs_check(self, jti: str) -> bool:
+        """True when the shared store should be consulted for ``jti``."""
+        if not self.shared:
+            return False
+        with self._lock:
+            checked_at = self._checked.get(jti)
+        return checked_at is None or self._clock() - checked_at >= self.check_interval
+
+    def check(self, jti: str) -> bool:
+        """Consult the shared store; returns whether ``jti`` is revoked."""
+        entry = self.store.get(self._key(jti))
+        with self._lock:
+            if entry is not None:
+                self._revoked[jti] = entry["exp"]
+            else:
+                self._checked[jti] = self._clock()
+                self._checked.move_to_end(jti)
+            self._prune()
+        return entry is not None
+
+    def _prune(self) -> None:
+        now = self._clock()
+        if len(self._revoked) > self.max_entries:
+            self._revoked = {jti: exp for jti, exp in self._revoked.items() if exp > now}
+        while len(self._checked) > self.max_entries:
+            self._checked.popitem(last=False)
+
+
+class TokenSigner:
+    def __init__(self, ttl: float, revocations: RevocationList, clock=time.time):
+        self.ttl = ttl
+        self.revocations = revocations
+        self._clock = clock
+
+    def issue(self, user_data: dict) -> str:
+        claims = {
+            "user": user_data,
+            "jti": secrets.token_urlsafe(12),
+            "exp": int(self._clock() + self.ttl),
+        }
+        return signing.dumps(claims, salt=SALT)
+
+    def _load(self, token: str) -> Optional[dict]:
+        try:
+            return signing.loads(token, salt=SALT)
+        except signing.BadSignature:
+            return None
+
+    def verify(self, token: str) -> Optional[dict]:
+        """Claims of a valid, unexpired token not revoked locally, else None."""
+        claims = self._load(token)
+        if claims is None or claims["exp"] <= self._clock():
+            return None
+        if self.revocations.is_revoked(claims["jti"]):
+            return None
+        return claims
+
+    def revoke(self, token: str) -> None:
+        claims = self._load(token)
+        if claims is not None:
+            self.revocations.revoke(claims["jti"], claims["exp"])
+
+
+def get_token_signer(store: SessionStore, ttl: float) -> Optional[TokenSigner]:
+    mode = os.environ.get("SESSION_TOKENS", "opaque")
+    if mode == "opaque":
+        return None
+    if mode == "signed":
+        revocations = RevocationList(
+            store, check_interval=float(os.environ.get("TOKEN_REVOCATION_CHECK_INTERVAL", "30"))
+        )
+        return TokenSigner(ttl, revocations)
+    raise ValueError(f"Unknown SESSION_TOKENS: {mode}")
@@ -0,0 +1,15 @@
+"""Gunicorn worker class for the FastAPI app (see gunicorn_api.conf.py)."""
+from uvicorn_worker import UvicornWorker as BaseUvicornWorker
+
+
+class UvicornWorker(BaseUvicornWorker):
+    # Explicit rather than "auto", so a missing uvloop/httptools fails at boot
+    # instead of silently falling back to asyncio/h11
+    CONFIG_KWARGS = {"loop": "uvloop", "http": "httptools", "lifespan": "on"}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Order event streams never finish on their own: cancel what is still
+        # running a little before gunicorn kills the worker, so the lifespan
+        # shutdown still runs
+        self.config.timeout_graceful_shutdown = max(self.cfg.graceful_timeout - 2, 1)
@@ -0,0 +1,85 @@
+"""Production serving profile for the FastAPI app.
+
+    gunicorn -c gunicorn_api.conf.py fastapi_app.main:app
+
+One gunicorn master supervises WEB_CONCURRENCY uvicorn workers (uvloop and
+httptools), one per core by default. Handlers are async and DB work runs on
+each worker's DB_THREADS executor, so a worker per core is enough to use the
+CPUs. DB_THREADS defaults to the worker's share of DB_MAX_CONNECTIONS, so
+the workers together stay within PostgreSQL's max_connections; settings
+that cannot fit in it are refused at startup. Migrations and seeding are
+not run here; see the "migrate" job in docker-compose.yml.
+
+Signals to the master:
+- HUP reloads the code gracefully. New workers start, and old ones finish
+  their in-flight requests (up to graceful_timeout) before exiting.
+- TERM shuts down gracefully.
+- TTIN and TTOU add or remove a worker. TTIN stops at the connection budget.
+"""
+import multiprocessing
+import os
+import shutil
+
+# Connections all workers may hold together. PostgreSQL allows 100 by default;
+# the rest is left to the Django admin, migrations and psql sessions
+db_max_connections = int(os.environ.get("DB_MAX_CONNECTIONS", "80"))
+# Held by each worker besides its DB threads: the session sweeper, the
+# metrics sampler and the order events LISTEN connection
+worker_extra_connections = 3
+
+bind = os.environ.get("API_BIND", "0.0.0.0:8001")
+# One per core, but no more than the budget allows with a single DB thread each
+workers = int(os.environ.get(
+    "WEB_CONCURRENCY",
+    str(min(multiprocessing.cpu_count(), db_max_connections // (1 + worker_extra_connections))),
+))
+worker_class = "fastapi_app.workers.UvicornWorker"
+graceful_timeout = int(os.environ.get("GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.environ.get("WORKER_TIMEOUT", "60"))
+keepalive = int(os.environ.get("KEEPALIVE", "5"))
+# Access logs cost a formatted line per request; the metrics and query logs cover it
+accesslog = os.environ.get("ACCESS_LOG") or None
+errorlog = "-"
+
+db_threads = int(os.environ.get(
+    "DB_THREADS", str(min(16, db_max_connections // workers - worker_extra_connections))
+))
+if db_threads < 1 or workers * (db_threads + worker_extra_connections) > db_max_connections:
+    raise RuntimeError(
+        f"WEB_CONCURRENCY={workers} with DB_THREADS={max(db_threads, 1)} needs "
+        f"{workers * (max(db_threads, 1) + worker_extra_connections)} database connections, more than "
+        f"DB_MAX_CONNECTIONS={db_max_connections}; lower WEB_CONCURRENCY or DB_THREADS, or raise DB_MAX_CONNECTIONS"
+    )
+# Workers TTIN may go up to
+max_workers = db_max_connections // (db_threads + worker_extra_connections)
+
+# Set here, in the master, so every worker inherits them before importing the app
+os.environ["DB_THREADS"] = str(db_threads)
+if workers > 1:
+    # Sessions and token revocations have to be visible to every worker
+    os.environ.setdefault("SESSION_BACKEND", "database")
+# One password-hashing process per worker: cores in total, not cores squared
+os.environ.setdefault("AUTH_HASH_WORKERS", "1")
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/fastapi-metrics")
+
+# Imported here, not in child_exit: that hook runs inside the SIGCHLD handler
+from prometheus_client import multiprocess  # noqa: E402
+
+
+def on_starting(server):
+    # Metrics files left by a previous run would be added to this one's
+    path = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+
+
+def nworkers_changed(server, new_value, old_value):
+    if new_value > max_workers:
+        server.log.warning(
+            "Keeping %d workers: more would exceed DB_MAX_CONNECTIONS=%d", max_workers, db_max_connections
+        )
+        server.num_workers = max_workers
+
+
+def child_exit(server, worker):
+    multiprocess.mark_process_dead(worker.pid)